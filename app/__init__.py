@@ -1,6 +1,13 @@
 from flask import Flask
 from app.config import load_configurations, configure_logging
-from .views import webhook_blueprint
+from app.utils.tracing import init_tracing
+from app.services.journal_service import init_journal
+from app.services.openai_governor import init_governor
+from app.services.forwarding_service import init_forwarding
+from app.services.shadow_service import init_shadow
+from app.services.scheduler_service import init_scheduler
+from app.services.settings_service import init_settings_reload
+from .views import admin_blueprint, webhook_blueprint
 
 
 def create_app():
@@ -19,6 +26,17 @@ def create_app():
     logging.info("📋 [APP INIT] Registering webhook blueprint...")
     app.register_blueprint(webhook_blueprint)
     logging.info("✅ [APP INIT] Webhook blueprint registered at /webhook")
+    app.register_blueprint(admin_blueprint)
+    logging.info(f"✅ [APP INIT] Admin blueprint registered at /admin ({'enabled' if app.config['ADMIN_TOKEN'] else 'disabled, ADMIN_TOKEN not set'})")
+
+    # First, so invalid settings stop startup before any background thread starts
+    init_settings_reload(app)
+    init_governor(app)
+    init_tracing(app)
+    init_journal(app)
+    init_forwarding(app)
+    init_shadow(app)
+    init_scheduler(app)
     
     logging.info("✅ [APP INIT] Flask application created successfully!")
     logging.info("=" * 80)
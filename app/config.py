@@ -1,40 +1,147 @@
 import sys
 import os
-from dotenv import load_dotenv
+from dotenv import find_dotenv, load_dotenv
 import logging
 
+# trace_id/span_id are filled in by app.utils.tracing ("-" outside a request)
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(trace_id)s %(span_id)s] - %(message)s"
+
+# The env file is re-read on hot reload; variables set in the real process
+# environment keep precedence over it, as they do for load_dotenv at startup
+ENV_FILE = os.getenv("ENV_FILE") or find_dotenv() or ".env"
+PROCESS_ENVIRON = dict(os.environ)
+
+# Captured once by init_* functions (threads, files, pools); a reload reports
+# changes to these but they only take effect after a restart
+RESTART_REQUIRED = frozenset(
+    {
+        "ENV",
+        "DEBUG",
+        "TRACE_ENABLED",
+        "PROFILE_SLOW_MS",
+        "PROFILE_MODE",
+        "PROFILE_INTERVAL_MS",
+        "JOURNAL_DIR",
+        "JOURNAL_SEGMENT_MB",
+        "JOURNAL_FSYNC",
+        "SHADOW_ENGINE",
+        "SHADOW_FRACTION",
+        "SHADOW_DB",
+        "SHADOW_MAX_IN_FLIGHT",
+        "SHADOW_TIMEOUT_MS",
+        "SCHEDULER_DB",
+        "SCHEDULER_BATCH_SIZE",
+        "FORWARD_URLS",
+        "FORWARD_TIMEOUT_MS",
+        "FORWARD_BATCH_MS",
+        "CONFIG_WATCH_SECONDS",
+        "RESPONSE_WORKERS",
+        "OPENAI_CONCURRENCY_INITIAL",
+        "OPENAI_CONCURRENCY_MAX",
+    }
+)
+
+
+def read_settings(environ):
+    """
+    Build the settings dict from an environment mapping. Raises ValueError
+    for malformed numbers.
+    """
+    getenv = environ.get
+    settings = {}
+    settings["ACCESS_TOKEN"] = getenv("ACCESS_TOKEN")
+    settings["YOUR_PHONE_NUMBER"] = getenv("YOUR_PHONE_NUMBER")
+    settings["APP_ID"] = getenv("APP_ID")
+    settings["APP_SECRET"] = getenv("APP_SECRET")
+    settings["RECIPIENT_WAID"] = getenv("RECIPIENT_WAID")
+    settings["VERSION"] = getenv("VERSION")
+    settings["PHONE_NUMBER_ID"] = getenv("PHONE_NUMBER_ID")
+    settings["VERIFY_TOKEN"] = getenv("VERIFY_TOKEN")
+    settings["OPENAI_API_KEY"] = getenv("OPENAI_API_KEY")
+    settings["OPENAI_ASSISTANT_ID"] = getenv("OPENAI_ASSISTANT_ID")
+    settings["OPENAI_RUN_TIMEOUT"] = float(getenv("OPENAI_RUN_TIMEOUT", "60"))
+    settings["OPENAI_FALLBACK_MODEL"] = getenv("OPENAI_FALLBACK_MODEL", "gpt-3.5-turbo")
+    # Applied once at startup; a reload reports changes to these as restart_required
+    settings["OPENAI_CONCURRENCY_INITIAL"] = int(getenv("OPENAI_CONCURRENCY_INITIAL", "4"))
+    settings["OPENAI_CONCURRENCY_MAX"] = int(getenv("OPENAI_CONCURRENCY_MAX", "32"))
+    settings["RESPONSE_WORKERS"] = int(getenv("RESPONSE_WORKERS", "16"))
+
+    # Production settings
+    settings["ENV"] = getenv("FLASK_ENV", "production")
+    settings["DEBUG"] = getenv("FLASK_DEBUG", "False").lower() == "true"
+    settings["JSON_SORT_KEYS"] = False
+    settings["ADMIN_TOKEN"] = getenv("ADMIN_TOKEN", "")
+    # Hot reload: seconds between env file checks (0 = SIGHUP/admin endpoint only)
+    settings["CONFIG_WATCH_SECONDS"] = float(getenv("CONFIG_WATCH_SECONDS", "2"))
+
+    # Tracing and slow-request profiling (both off by default)
+    settings["TRACE_ENABLED"] = getenv("TRACE_ENABLED", "False").lower() == "true"
+    settings["PROFILE_SLOW_MS"] = int(getenv("PROFILE_SLOW_MS", "0"))
+    settings["PROFILE_MODE"] = getenv("PROFILE_MODE", "sample")
+    settings["PROFILE_INTERVAL_MS"] = int(getenv("PROFILE_INTERVAL_MS", "10"))
+    settings["PROFILE_DIR"] = getenv("PROFILE_DIR", "profiles")
+    settings["PROFILE_KEEP"] = int(getenv("PROFILE_KEEP", "50"))
+
+    # Webhook journal (disabled unless JOURNAL_DIR is set)
+    settings["JOURNAL_DIR"] = getenv("JOURNAL_DIR", "")
+    settings["JOURNAL_SEGMENT_MB"] = int(getenv("JOURNAL_SEGMENT_MB", "64"))
+    settings["JOURNAL_FSYNC"] = getenv("JOURNAL_FSYNC", "False").lower() == "true"
+
+    # Response generation: primary engine, latency budget and hedging
+    settings["RESPONSE_ENGINE"] = getenv("RESPONSE_ENGINE", "echo")
+    settings["RESPONSE_BUDGET_MS"] = int(getenv("RESPONSE_BUDGET_MS", "25000"))
+    settings["RESPONSE_HEDGE_MS"] = int(getenv("RESPONSE_HEDGE_MS", "5000"))
+    settings["RESPONSE_BACKUPS"] = [
+        b.strip() for b in getenv("RESPONSE_BACKUPS", "faq,holding").split(",") if b.strip()
+    ]
+    settings["RESPONSE_HOLDING_TEXT"] = getenv(
+        "RESPONSE_HOLDING_TEXT", "Give me a moment, I'm looking that up for you..."
+    )
+    settings["RESPONSE_TIMEOUT_TEXT"] = getenv(
+        "RESPONSE_TIMEOUT_TEXT", "Sorry, I couldn't answer that in time. Please try again or contact the host directly."
+    )
+    settings["FAQ_PATH"] = getenv("FAQ_PATH", "data/faq.json")
+
+    # Shadow traffic: mirror a fraction of messages to a candidate engine (disabled unless SHADOW_ENGINE is set)
+    settings["SHADOW_ENGINE"] = getenv("SHADOW_ENGINE", "")
+    settings["SHADOW_FRACTION"] = float(getenv("SHADOW_FRACTION", "0.1"))
+    settings["SHADOW_DB"] = getenv("SHADOW_DB", "shadow_results.db")
+    settings["SHADOW_MAX_IN_FLIGHT"] = int(getenv("SHADOW_MAX_IN_FLIGHT", "2"))
+    settings["SHADOW_TIMEOUT_MS"] = int(getenv("SHADOW_TIMEOUT_MS", "30000"))
+
+    # Scheduled messages (disabled unless SCHEDULER_DB is set)
+    settings["SCHEDULER_DB"] = getenv("SCHEDULER_DB", "")
+    settings["SCHEDULER_BATCH_SIZE"] = int(getenv("SCHEDULER_BATCH_SIZE", "100"))
+    # Nudge a guest who has gone quiet; 0 disables the follow-up
+    settings["SCHEDULER_FOLLOWUP_MINUTES"] = float(getenv("SCHEDULER_FOLLOWUP_MINUTES", "0"))
+    settings["SCHEDULER_FOLLOWUP_TEXT"] = getenv(
+        "SCHEDULER_FOLLOWUP_TEXT", "Is there anything else we can help you with before your stay?"
+    )
+
+    # Forwarding proxy mode (disabled unless FORWARD_URLS is set)
+    settings["FORWARD_URLS"] = [u.strip() for u in getenv("FORWARD_URLS", "").split(",") if u.strip()]
+    settings["FORWARD_TIMEOUT_MS"] = int(getenv("FORWARD_TIMEOUT_MS", "5000"))
+    settings["FORWARD_BATCH_MS"] = int(getenv("FORWARD_BATCH_MS", "200"))
+    settings["FORWARD_REPLY_TOKEN"] = getenv("FORWARD_REPLY_TOKEN", "")
+    return settings
+
 
 def load_configurations(app):
     logging.info("=" * 80)
     logging.info("⚙️ [CONFIG] Loading configurations from environment...")
     
-    load_dotenv()
-    logging.info("✅ [CONFIG] Environment variables loaded from .env file")
-    
-    # Load and log each configuration
-    access_token = os.getenv("ACCESS_TOKEN")
-    your_phone = os.getenv("YOUR_PHONE_NUMBER")
-    app_id = os.getenv("APP_ID")
-    app_secret = os.getenv("APP_SECRET")
-    recipient_waid = os.getenv("RECIPIENT_WAID")
-    version = os.getenv("VERSION")
-    phone_id = os.getenv("PHONE_NUMBER_ID")
-    verify_token = os.getenv("VERIFY_TOKEN")
+    load_dotenv(ENV_FILE)
+    logging.info(f"✅ [CONFIG] Environment variables loaded from {ENV_FILE}")
     
-    # Set configurations
-    app.config["ACCESS_TOKEN"] = access_token
-    app.config["YOUR_PHONE_NUMBER"] = your_phone
-    app.config["APP_ID"] = app_id
-    app.config["APP_SECRET"] = app_secret
-    app.config["RECIPIENT_WAID"] = recipient_waid
-    app.config["VERSION"] = version
-    app.config["PHONE_NUMBER_ID"] = phone_id
-    app.config["VERIFY_TOKEN"] = verify_token
-    
-    # Production settings
-    app.config["ENV"] = os.getenv("FLASK_ENV", "production")
-    app.config["DEBUG"] = os.getenv("FLASK_DEBUG", "False").lower() == "true"
-    app.config["JSON_SORT_KEYS"] = False
+    app.config.update(read_settings(os.environ))
+    access_token = app.config["ACCESS_TOKEN"]
+    your_phone = app.config["YOUR_PHONE_NUMBER"]
+    app_id = app.config["APP_ID"]
+    app_secret = app.config["APP_SECRET"]
+    recipient_waid = app.config["RECIPIENT_WAID"]
+    version = app.config["VERSION"]
+    phone_id = app.config["PHONE_NUMBER_ID"]
+    verify_token = app.config["VERIFY_TOKEN"]
     
     # Log configuration status
     logging.info("📋 [CONFIG] Environment variables loaded:")
@@ -48,6 +155,15 @@ def load_configurations(app):
     logging.info(f"  VERIFY_TOKEN: {'✅ Set' if verify_token else '❌ NOT SET'}")
     logging.info(f"  FLASK_ENV: {app.config['ENV']}")
     logging.info(f"  FLASK_DEBUG: {app.config['DEBUG']}")
+    logging.info(f"  ADMIN_TOKEN: {'✅ Set' if app.config['ADMIN_TOKEN'] else '❌ NOT SET (admin endpoints disabled)'}")
+    logging.info(f"  TRACE_ENABLED: {app.config['TRACE_ENABLED']}")
+    logging.info(f"  PROFILE_SLOW_MS: {app.config['PROFILE_SLOW_MS'] or 'disabled'}")
+    logging.info(f"  JOURNAL_DIR: {app.config['JOURNAL_DIR'] or 'disabled'}")
+    logging.info(f"  RESPONSE_ENGINE: {app.config['RESPONSE_ENGINE']} (backups: {', '.join(app.config['RESPONSE_BACKUPS']) or 'none'})")
+    logging.info(f"  SHADOW_ENGINE: {app.config['SHADOW_ENGINE'] or 'disabled'}")
+    logging.info(f"  SCHEDULER_DB: {app.config['SCHEDULER_DB'] or 'disabled'}")
+    logging.info(f"  FORWARD_URLS: {', '.join(app.config['FORWARD_URLS']) or 'disabled'}")
+    logging.info(f"  RESPONSE_BUDGET_MS: {app.config['RESPONSE_BUDGET_MS']} (hedge after {app.config['RESPONSE_HEDGE_MS']})")
     logging.info("✅ [CONFIG] All configurations loaded successfully!")
     logging.info("=" * 80)
 
@@ -56,7 +172,7 @@ def configure_logging():
     log_level = os.getenv("LOG_LEVEL", "INFO")
     logging.basicConfig(
         level=getattr(logging, log_level),
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        format=LOG_FORMAT,
         stream=sys.stdout,
     )
     
@@ -64,5 +180,5 @@ def configure_logging():
     logger = logging.getLogger(__name__)
     logger.info("=" * 80)
     logger.info(f"🔌 [LOGGING] Logging configured with level: {log_level}")
-    logger.info("📝 [LOGGING] Format: %(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logger.info(f"📝 [LOGGING] Format: {LOG_FORMAT}")
     logger.info("=" * 80)
@@ -1,9 +1,12 @@
 from functools import wraps
-from flask import current_app, jsonify, request
+from flask import jsonify, request
 import logging
 import hashlib
 import hmac
 
+from app.services.settings_service import current_settings
+from app.utils.tracing import span
+
 
 def validate_signature(payload, signature):
     """
@@ -14,7 +17,7 @@ def validate_signature(payload, signature):
     try:
         # Use the App Secret to hash the payload
         expected_signature = hmac.new(
-            bytes(current_app.config["APP_SECRET"], "latin-1"),
+            bytes(current_settings()["APP_SECRET"], "latin-1"),
             msg=payload.encode("utf-8"),
             digestmod=hashlib.sha256,
         ).hexdigest()
@@ -67,7 +70,9 @@ def signature_required(f):
             logging.debug(f"Request data length: {len(request_data)} bytes")
             
             # Validate signature
-            if not validate_signature(request_data, signature):
+            with span("signature_required"):
+                is_valid = validate_signature(request_data, signature)
+            if not is_valid:
                 logging.error("❌ [SECURITY DECORATOR] Signature verification failed!")
                 logging.info("=" * 80)
                 return jsonify({"status": "error", "message": "Invalid signature"}), 403
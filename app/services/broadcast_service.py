@@ -0,0 +1,332 @@
+import csv
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.utils.outbound_messages import template_message
+
+# Graph API error codes that mean "slow down" even when the HTTP status is not 429
+THROTTLE_ERROR_CODES = {4, 80007, 130429, 131056}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire()` blocks until a token is available.
+    The refill rate can be changed at runtime so the sender can back off on 429s;
+    the burst size follows the rate so a lowered rate can't burst at the old size.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.max_capacity = float(capacity or max(1.0, rate))
+        self.capacity = self.max_capacity
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = min(self.max_capacity, max(1.0, self.rate))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class BroadcastCheckpoint:
+    """
+    Append-only checkpoint file so a crashed broadcast can be resumed without
+    resending to anyone.
+
+    Each line is `<state>\\t<wa_id>[\\t<status>]`:
+      C  the recipient was claimed (written *before* the send request)
+      D  the send finished, with its final status
+
+    A recipient is claimed (with an fsync) immediately before its send request,
+    so after a crash only requests that were actually in flight, at most one
+    per worker, are "claimed but not done". Those are never resent on resume;
+    they are reported as `unknown` instead. Done lines are flushed as they are
+    written, so they survive the process being killed, and fsynced every
+    `fsync_every` lines against power loss.
+    """
+
+    def __init__(self, path, fsync_every=50):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.unsynced = 0
+        self.claimed = set()
+        self.done = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    if len(parts) >= 2 and parts[0] == "C":
+                        self.claimed.add(parts[1])
+                    elif len(parts) >= 3 and parts[0] == "D":
+                        self.done[parts[1]] = parts[2]
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+
+    def interrupted(self):
+        """Recipients that were claimed by a previous run but never finished."""
+        return self.claimed - set(self.done)
+
+    def claim(self, wa_id):
+        with self.lock:
+            self.file.write(f"C\t{wa_id}\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+            self.claimed.add(wa_id)
+
+    def mark_done(self, wa_id, status):
+        with self.lock:
+            self.file.write(f"D\t{wa_id}\t{status}\n")
+            self.file.flush()
+            self.unsynced += 1
+            if self.unsynced >= self.fsync_every:
+                os.fsync(self.file.fileno())
+                self.unsynced = 0
+            self.done[wa_id] = status
+
+    def close(self):
+        with self.lock:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+
+def load_recipients(path):
+    """
+    Read recipients from a text or CSV file. The first column of each row is the
+    WhatsApp ID; blank lines, `#` comments and a `wa_id` header are skipped.
+    Duplicates are dropped so nobody gets the message twice.
+    """
+    recipients = []
+    seen = set()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#"):
+                continue
+            wa_id = row[0].strip()
+            if wa_id.lower() == "wa_id" or wa_id in seen:
+                continue
+            seen.add(wa_id)
+            recipients.append(wa_id)
+    return recipients
+
+
+def _is_throttled(response):
+    if response.status_code == 429:
+        return True
+    try:
+        code = response.json().get("error", {}).get("code")
+    except ValueError:
+        return False
+    return code in THROTTLE_ERROR_CODES
+
+
+def _retry_after(response, default):
+    try:
+        return float(response.headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+def run_broadcast(
+    recipients,
+    template_name,
+    language_code,
+    access_token,
+    version,
+    phone_number_id,
+    checkpoint_path,
+    results_path,
+    rate=20.0,
+    concurrency=16,
+    components=None,
+    max_retries=5,
+    done_fsync_every=50,
+    recovery_streak=50,
+    progress_interval=5.0,
+):
+    """
+    Send a template message to every recipient, at most `rate` messages/second.
+
+    On a throttling response the send rate is halved (down to 1 msg/s), the
+    worker waits for `Retry-After` and the recipient is retried. Every
+    `recovery_streak` consecutive successes the rate creeps back up by 10% of
+    the configured maximum. Completed sends share one checkpoint fsync per
+    `done_fsync_every` lines. Per-recipient results are appended to `results_path`
+    as CSV (`wa_id,status,message_id,error`).
+
+    Returns a dict of counters.
+    """
+    logging.info("=" * 80)
+    logging.info(f"📣 [BROADCAST] Template '{template_name}' to {len(recipients)} recipients")
+
+    checkpoint = BroadcastCheckpoint(checkpoint_path, fsync_every=done_fsync_every)
+    interrupted = checkpoint.interrupted()
+    pending = [r for r in recipients if r not in checkpoint.claimed]
+    skipped = sum(1 for r in recipients if r in checkpoint.done)
+    if skipped:
+        logging.info(f"⏭️ [BROADCAST] Resuming: {skipped} recipients already handled by a previous run")
+    if interrupted:
+        logging.warning(
+            f"⚠️ [BROADCAST] {len(interrupted)} recipients were in flight when the previous run stopped; "
+            "they will NOT be resent and are recorded as 'unknown'"
+        )
+
+    results_file = open(results_path, "a", encoding="utf-8", newline="")
+    results_writer = csv.writer(results_file)
+    results_lock = threading.Lock()
+    for wa_id in sorted(interrupted):
+        results_writer.writerow([wa_id, "unknown", "", "interrupted by previous run"])
+        checkpoint.mark_done(wa_id, "unknown")
+
+    url = f"https://graph.facebook.com/{version}/{phone_number_id}/messages"
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=concurrency))
+    session.headers.update(
+        {
+            "Content-type": "application/json",
+            "Authorization": f"Bearer {access_token}",
+        }
+    )
+
+    bucket = TokenBucket(rate)
+    stats = {"sent": 0, "failed": 0, "unknown": len(interrupted), "throttled": 0, "skipped": skipped}
+    completed = [0]
+    state = {"rate": float(rate), "streak": 0, "last_cut": 0.0}
+    state_lock = threading.Lock()
+    work = queue.Queue()
+
+    def record(wa_id, status, message_id="", error=""):
+        checkpoint.mark_done(wa_id, status)
+        with results_lock:
+            results_writer.writerow([wa_id, status, message_id, error])
+        with state_lock:
+            stats[status] += 1
+            completed[0] += 1
+
+    def on_throttle(response):
+        retry_after = _retry_after(response, 1.0)
+        with state_lock:
+            stats["throttled"] += 1
+            state["streak"] = 0
+            # Concurrent workers usually hit the same limit together; cut the rate once per window
+            now = time.monotonic()
+            cut = now - state["last_cut"] >= retry_after
+            if cut:
+                state["last_cut"] = now
+                state["rate"] = max(1.0, state["rate"] / 2)
+                bucket.set_rate(state["rate"])
+            new_rate = state["rate"]
+        if cut:
+            logging.warning(f"🐢 [BROADCAST] Throttled by WhatsApp API, rate lowered to {new_rate:.1f} msg/s")
+        time.sleep(retry_after)
+
+    def on_success():
+        with state_lock:
+            state["streak"] += 1
+            if state["streak"] >= recovery_streak and state["rate"] < rate:
+                state["streak"] = 0
+                state["rate"] = min(float(rate), state["rate"] + rate * 0.1)
+                bucket.set_rate(state["rate"])
+
+    def send_one(wa_id):
+        data = template_message(wa_id, template_name, language_code, components=components)
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            if attempt == 0:
+                # Claimed right before the first request, so a crash can't strand queued recipients
+                checkpoint.claim(wa_id)
+            try:
+                response = session.post(url, data=data, timeout=10)
+            except requests.RequestException as e:
+                # The request may or may not have reached WhatsApp; retrying could double-send
+                record(wa_id, "unknown", error=str(e)[:200])
+                return
+            if _is_throttled(response) and attempt < max_retries:
+                on_throttle(response)
+                continue
+            if response.status_code >= 400:
+                record(wa_id, "failed", error=response.text[:200].replace("\n", " "))
+                return
+            message_id = ""
+            try:
+                message_id = response.json()["messages"][0]["id"]
+            except (ValueError, KeyError, IndexError):
+                pass
+            record(wa_id, "sent", message_id)
+            on_success()
+            return
+
+    def worker():
+        while True:
+            try:
+                wa_id = work.get_nowait()
+            except queue.Empty:
+                return
+            send_one(wa_id)
+
+    for wa_id in pending:
+        work.put(wa_id)
+
+    started = time.monotonic()
+    stop_progress = threading.Event()
+
+    def report_progress():
+        while not stop_progress.wait(progress_interval):
+            with state_lock:
+                done = completed[0]
+                current_rate = state["rate"]
+            elapsed = time.monotonic() - started
+            logging.info(
+                f"📊 [BROADCAST] {done}/{len(pending)} done "
+                f"({done / elapsed if elapsed else 0:.1f} msg/s, limit {current_rate:.1f} msg/s, "
+                f"sent={stats['sent']} failed={stats['failed']} throttled={stats['throttled']})"
+            )
+            with results_lock:
+                results_file.flush()
+
+    progress_thread = threading.Thread(target=report_progress, daemon=True)
+    progress_thread.start()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+    finally:
+        stop_progress.set()
+        progress_thread.join()
+        results_file.close()
+        checkpoint.close()
+        session.close()
+
+    elapsed = time.monotonic() - started
+    logging.info(
+        f"✅ [BROADCAST] Finished in {elapsed:.1f}s: sent={stats['sent']} failed={stats['failed']} "
+        f"unknown={stats['unknown']} skipped={stats['skipped']} throttled={stats['throttled']}"
+    )
+    logging.info("=" * 80)
+    return stats
@@ -0,0 +1,251 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class ForwardTarget:
+    """
+    One downstream bot. Each target has its own session so its keep-alive
+    connections are reused across requests and its pool is sized independently.
+    """
+
+    def __init__(self, url, timeout, pool_size):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=1000)
+
+    def post(self, body, headers):
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=body, headers=headers, timeout=self.timeout)
+            response.raise_for_status()
+            return response
+        except requests.RequestException:
+            with self.lock:
+                self.errors += 1
+            raise
+        finally:
+            with self.lock:
+                self.sent += 1
+                self.latencies.append((time.perf_counter() - started) * 1000)
+
+    def snapshot(self):
+        with self.lock:
+            values = sorted(self.latencies)
+            return {
+                "sent": self.sent,
+                "errors": self.errors,
+                "p50_ms": round(values[len(values) // 2], 1) if values else None,
+                "p99_ms": round(values[min(len(values) - 1, int(len(values) * 0.99))], 1) if values else None,
+            }
+
+
+class RecentIds:
+    """
+    Bounded LRU set used to drop webhook events Meta delivers more than once.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.ids = OrderedDict()
+        self.lock = threading.Lock()
+
+    def seen(self, event_id):
+        with self.lock:
+            if event_id in self.ids:
+                self.ids.move_to_end(event_id)
+                return True
+            return False
+
+    def add(self, event_id):
+        with self.lock:
+            self.ids[event_id] = None
+            if len(self.ids) > self.size:
+                self.ids.popitem(last=False)
+
+
+def event_ids(body):
+    """IDs of the messages in a webhook body, used for deduplication."""
+    ids = []
+    for entry in body.get("entry", []):
+        for change in entry.get("changes", []):
+            for message in change.get("value", {}).get("messages", []):
+                if message.get("id"):
+                    ids.append(message["id"])
+    return ids
+
+
+def is_status_event(body):
+    changes = [change for entry in body.get("entry", []) for change in entry.get("changes", [])]
+    return bool(changes) and all(
+        change.get("value", {}).get("statuses") and not change.get("value", {}).get("messages")
+        for change in changes
+    )
+
+
+class Forwarder:
+    """
+    Forwards verified webhook events to one or more downstream bots.
+
+    Message events are fanned out to every target concurrently and the request
+    waits for them (bounded by the per-target timeout) so replies in the
+    response bodies can be sent back through our outbound sender. Status events
+    are acknowledged immediately and forwarded in micro-batches: entries from
+    several webhooks are merged into one payload, which cuts the number of
+    downstream requests during delivery/read receipt bursts.
+    """
+
+    def __init__(self, urls, secret, timeout=5.0, pool_size=16, batch_interval=0.2, batch_max=100, dedup_size=10000):
+        self.targets = [ForwardTarget(url, timeout, pool_size) for url in urls]
+        self.secret = secret
+        self.batch_interval = batch_interval
+        self.batch_max = batch_max
+        self.executor = ThreadPoolExecutor(max_workers=max(4, len(self.targets) * 4), thread_name_prefix="forward")
+        self.recent = RecentIds(dedup_size)
+        self.statuses = queue.Queue(maxsize=100000)
+        self.batches = 0
+        self.failed_batches = 0
+        self.duplicates = 0
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def _headers(self, body):
+        # Re-sign so downstream bots can verify payloads with the same App Secret Meta uses
+        signature = hmac.new(bytes(self.secret, "latin-1"), msg=body, digestmod=hashlib.sha256).hexdigest()
+        return {
+            "Content-Type": "application/json",
+            "X-Hub-Signature-256": f"sha256={signature}",
+            "X-Forwarded-By": "whatsapp-webhook-proxy",
+        }
+
+    def fan_out(self, body):
+        """
+        POST `body` to every target concurrently. Returns a list of
+        (target, response or exception) in target order.
+        """
+        headers = self._headers(body)
+        futures = [self.executor.submit(target.post, body, headers) for target in self.targets]
+        wait(futures)
+        results = []
+        for target, future in zip(self.targets, futures):
+            try:
+                results.append((target, future.result()))
+            except Exception as e:
+                logging.warning(f"⚠️ [FORWARD] {target.url} failed: {str(e)}")
+                results.append((target, e))
+        return results
+
+    def forward_message(self, raw_body, body):
+        """
+        Forward a message event. Returns (delivered, replies) where `replies` are
+        the WhatsApp message payloads downstream bots returned as
+        `{"messages": [...]}`, or None if the event was a duplicate.
+        """
+        ids = event_ids(body)
+        if ids and all(self.recent.seen(event_id) for event_id in ids):
+            with self.lock:
+                self.duplicates += 1
+            logging.info(f"♻️ [FORWARD] Duplicate delivery of {ids}, not forwarding")
+            return True, None
+
+        results = self.fan_out(raw_body)
+        delivered = any(not isinstance(result, Exception) for _, result in results)
+        replies = []
+        for target, result in results:
+            if isinstance(result, Exception) or not result.content:
+                continue
+            try:
+                replies.extend(result.json().get("messages", []))
+            except (ValueError, AttributeError):
+                logging.debug(f"Non-JSON or non-object reply from {target.url} ignored")
+        # Only remember IDs that made it somewhere, so Meta's retry of a failed event gets through
+        if delivered:
+            for event_id in ids:
+                self.recent.add(event_id)
+        return delivered, replies
+
+    def enqueue_status(self, body):
+        if self.pid != os.getpid():
+            self._start()
+        try:
+            self.statuses.put_nowait(body)
+        except queue.Full:
+            logging.warning("⚠️ [FORWARD] Status batch queue full, dropping status event")
+
+    def _start(self):
+        # Started lazily so the batching thread is created after gunicorn forks
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._run_batcher, name="forward-batcher", daemon=True).start()
+
+    def _run_batcher(self):
+        while True:
+            first = self.statuses.get()
+            entries = list(first.get("entry", []))
+            deadline = time.monotonic() + self.batch_interval
+            while len(entries) < self.batch_max:
+                try:
+                    body = self.statuses.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                entries.extend(body.get("entry", []))
+            payload = json.dumps({"object": first.get("object", "whatsapp_business_account"), "entry": entries})
+            try:
+                results = self.fan_out(payload.encode("utf-8"))
+                delivered = any(not isinstance(result, Exception) for _, result in results)
+            except Exception as e:
+                logging.error(f"❌ [FORWARD] Failed to forward status batch: {str(e)}", exc_info=True)
+                delivered = False
+            with self.lock:
+                if delivered:
+                    self.batches += 1
+                else:
+                    self.failed_batches += 1
+            if not delivered:
+                logging.error(f"❌ [FORWARD] Status batch of {len(entries)} entries reached no target, dropped")
+
+    def snapshot(self):
+        return {
+            "targets": {target.url: target.snapshot() for target in self.targets},
+            "status_batches": self.batches,
+            "failed_status_batches": self.failed_batches,
+            "duplicates": self.duplicates,
+            "queued_statuses": self.statuses.qsize(),
+        }
+
+
+def init_forwarding(app):
+    """
+    Attach a Forwarder to the app when FORWARD_URLS is configured.
+    """
+    urls = app.config["FORWARD_URLS"]
+    if not urls:
+        return None
+    forwarder = Forwarder(
+        urls,
+        app.config["APP_SECRET"] or "",
+        timeout=app.config["FORWARD_TIMEOUT_MS"] / 1000,
+        batch_interval=app.config["FORWARD_BATCH_MS"] / 1000,
+    )
+    app.extensions["forwarder"] = forwarder
+    logging.info(f"↪️ [FORWARD] Forwarding mode enabled for {len(urls)} downstream bots: {', '.join(urls)}")
+    return forwarder
@@ -0,0 +1,220 @@
+import atexit
+import bisect
+import heapq
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+# Segment files are a sequence of compressed blocks:
+#   header  = magic, payload length, record count, crc32(payload), first timestamp (ns)
+#   payload = zlib(records), each record = timestamp (ns), body length, body
+# The .idx file next to each segment holds one (first timestamp, offset, count)
+# entry per block so readers can seek by time without decompressing everything.
+BLOCK_MAGIC = b"WJB1"
+BLOCK_HEADER = struct.Struct("<4sIIIQ")
+RECORD_HEADER = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQI")
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+class WebhookJournal:
+    """
+    Append-only journal of raw webhook bodies.
+
+    `append()` only puts the body on a queue; a background thread batches
+    records into compressed blocks and writes them to the current segment, so
+    the request thread never touches the disk. Every process writes its own
+    segments (the PID is part of the file name), which keeps gunicorn workers
+    from interleaving writes.
+    """
+
+    def __init__(self, directory, segment_bytes=64 * 1024 * 1024, batch_size=256, flush_interval=0.2, fsync=False):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.queue = queue.Queue(maxsize=100000)
+        self.dropped = 0
+        self.written = 0
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pid = None
+        self.segment = None
+        self.index = None
+        os.makedirs(directory, exist_ok=True)
+
+    def append(self, body, timestamp_ns=None):
+        # The writer thread is started lazily so it is created after gunicorn forks
+        if self.pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait((timestamp_ns or time.time_ns(), body))
+        except queue.Full:
+            self.dropped += 1
+            logging.warning(f"⚠️ [JOURNAL] Queue full, dropped webhook body ({self.dropped} dropped so far)")
+
+    def _start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            self.segment = None
+            self.index = None
+            self.thread = threading.Thread(target=self._run, name="webhook-journal", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write_block(batch)
+            except Exception as e:
+                logging.error(f"❌ [JOURNAL] Failed to write {len(batch)} records: {str(e)}", exc_info=True)
+            if stop:
+                return
+
+    def _open_segment(self):
+        if self.segment is not None:
+            self.segment.close()
+            self.index.close()
+        base = os.path.join(self.directory, f"{time.time_ns():020d}-{os.getpid()}")
+        self.segment = open(base + SEGMENT_SUFFIX, "ab")
+        self.index = open(base + INDEX_SUFFIX, "ab")
+        logging.info(f"📒 [JOURNAL] Opened segment {base}{SEGMENT_SUFFIX}")
+
+    def _write_block(self, batch):
+        if self.segment is None or self.segment.tell() >= self.segment_bytes:
+            self._open_segment()
+        payload = zlib.compress(
+            b"".join(RECORD_HEADER.pack(ts, len(body)) + body for ts, body in batch)
+        )
+        offset = self.segment.tell()
+        self.segment.write(
+            BLOCK_HEADER.pack(BLOCK_MAGIC, len(payload), len(batch), zlib.crc32(payload), batch[0][0]) + payload
+        )
+        self.segment.flush()
+        if self.fsync:
+            os.fsync(self.segment.fileno())
+        # The index is only a seek hint; readers fall back to scanning if it lags behind
+        self.index.write(INDEX_ENTRY.pack(batch[0][0], offset, len(batch)))
+        self.index.flush()
+        self.written += len(batch)
+
+    def close(self):
+        if self.thread is None or self.pid != os.getpid() or not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+        if self.segment is not None:
+            self.segment.close()
+            self.index.close()
+
+
+def init_journal(app):
+    """
+    Attach a WebhookJournal to the app when JOURNAL_DIR is configured.
+    """
+    directory = app.config["JOURNAL_DIR"]
+    if not directory:
+        logging.info("📒 [JOURNAL] Webhook journal disabled (JOURNAL_DIR not set)")
+        return None
+    journal = WebhookJournal(
+        directory,
+        segment_bytes=app.config["JOURNAL_SEGMENT_MB"] * 1024 * 1024,
+        fsync=app.config["JOURNAL_FSYNC"],
+    )
+    app.extensions["webhook_journal"] = journal
+    logging.info(f"📒 [JOURNAL] Journaling verified webhook bodies to {directory}")
+    return journal
+
+
+# --------------------------------------------------------------
+# Reading
+# --------------------------------------------------------------
+
+
+def list_segments(directory):
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(SEGMENT_SUFFIX)
+    )
+
+
+def _start_offset(segment_path, since_ns):
+    index_path = segment_path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+    if since_ns is None or not os.path.exists(index_path):
+        return 0
+    with open(index_path, "rb") as f:
+        data = f.read()
+    entries = [INDEX_ENTRY.unpack_from(data, i) for i in range(0, len(data) - INDEX_ENTRY.size + 1, INDEX_ENTRY.size)]
+    # Last block that starts at or before `since_ns` may still hold matching records
+    position = bisect.bisect_right([entry[0] for entry in entries], since_ns) - 1
+    return entries[position][1] if position >= 0 else 0
+
+
+def iter_segment(segment_path, since_ns=None, until_ns=None):
+    """
+    Yield (timestamp_ns, body) from one segment. The file is memory-mapped and
+    a truncated or corrupt tail (e.g. after a crash) ends the iteration.
+    """
+    with open(segment_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = _start_offset(segment_path, since_ns)
+            while offset + BLOCK_HEADER.size <= size:
+                magic, length, count, crc, first_ts = BLOCK_HEADER.unpack_from(data, offset)
+                start = offset + BLOCK_HEADER.size
+                if magic != BLOCK_MAGIC or start + length > size:
+                    logging.warning(f"⚠️ [JOURNAL] Truncated block at {segment_path}:{offset}, stopping")
+                    return
+                payload = data[start : start + length]
+                if zlib.crc32(payload) != crc:
+                    logging.warning(f"⚠️ [JOURNAL] Corrupt block at {segment_path}:{offset}, stopping")
+                    return
+                offset = start + length
+                if until_ns is not None and first_ts > until_ns:
+                    return
+                records = zlib.decompress(payload)
+                position = 0
+                for _ in range(count):
+                    ts, body_length = RECORD_HEADER.unpack_from(records, position)
+                    position += RECORD_HEADER.size
+                    body = records[position : position + body_length]
+                    position += body_length
+                    if since_ns is not None and ts < since_ns:
+                        continue
+                    if until_ns is not None and ts > until_ns:
+                        return
+                    yield ts, body
+
+
+def iter_journal(directory, since_ns=None, until_ns=None):
+    """
+    Yield (timestamp_ns, body) from every segment in `directory`, merged in
+    timestamp order across worker processes.
+    """
+    segments = [iter_segment(path, since_ns, until_ns) for path in list_segments(directory)]
+    return heapq.merge(*segments, key=lambda record: record[0])
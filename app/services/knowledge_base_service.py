@@ -0,0 +1,177 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST_VERSION = 1
+# Resolved from the repository, not the working directory, so every entry point shares one manifest
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DATA_DIR = os.path.join(REPO_ROOT, "data")
+MANIFEST_PATH = os.path.join(REPO_ROOT, "kb_manifest.json")
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {"version": MANIFEST_VERSION, "assistant_id": None, "attached": [], "files": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    # Write to a temp file and rename so a crash never leaves a half-written manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_documents(data_dir, manifest):
+    """
+    Return {content_hash: (relative_path, size, mtime_ns)} for every document under `data_dir`.
+
+    Files whose size and mtime match the manifest reuse the stored hash, so an
+    unchanged tree is scanned without reading any file contents.
+    """
+    known = {
+        entry["path"]: (entry["size"], entry["mtime_ns"], content_hash)
+        for content_hash, entry in manifest["files"].items()
+    }
+    documents = {}
+    for root, dirs, files in os.walk(data_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in sorted(files):
+            if name.startswith("."):
+                continue
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, data_dir)
+            stat = os.stat(full_path)
+            cached = known.get(rel_path)
+            if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+                content_hash = cached[2]
+            else:
+                content_hash = hash_file(full_path)
+            # Identical copies under different names only need to be uploaded once
+            documents.setdefault(content_hash, (rel_path, stat.st_size, stat.st_mtime_ns))
+    return documents
+
+
+def sync_knowledge_base(client, data_dir, manifest_path, assistant_id=None, create_assistant=None, workers=4):
+    """
+    Bring the assistant's knowledge base in line with the documents in `data_dir`.
+
+    - uploads new or changed documents (in parallel)
+    - attaches the resulting file set to the assistant, only if it changed
+    - deletes remote files whose content is no longer in `data_dir`
+
+    If no `assistant_id` is given, the one stored in the manifest is reused, or
+    `create_assistant(file_ids)` is called once and its ID remembered.
+
+    Upload and delete threads run in a copy of the caller's context, so a
+    sync started inside `background_priority()` stays background work.
+
+    Returns the assistant ID.
+    """
+    started = time.perf_counter()
+    logging.info("=" * 80)
+    logging.info(f"📚 [KB SYNC] Syncing knowledge base from {data_dir}")
+
+    manifest = load_manifest(manifest_path)
+    documents = scan_documents(data_dir, manifest)
+
+    to_upload = [h for h in documents if h not in manifest["files"]]
+    stale = [h for h in manifest["files"] if h not in documents]
+    logging.info(
+        f"📋 [KB SYNC] {len(documents)} documents: {len(to_upload)} to upload, "
+        f"{len(stale)} stale, {len(documents) - len(to_upload)} unchanged"
+    )
+
+    def upload(content_hash):
+        rel_path = documents[content_hash][0]
+        with open(os.path.join(data_dir, rel_path), "rb") as f:
+            remote = client.files.create(file=f, purpose="assistants")
+        logging.info(f"⬆️ [KB SYNC] Uploaded {rel_path} as {remote.id}")
+        return content_hash, remote.id
+
+    def delete(content_hash):
+        # Returns whether the manifest entry can be dropped
+        entry = manifest["files"][content_hash]
+        try:
+            client.files.delete(entry["file_id"])
+            logging.info(f"🗑️ [KB SYNC] Deleted stale {entry['path']} ({entry['file_id']})")
+        except Exception as e:
+            if getattr(e, "status_code", None) == 404:
+                # Already gone remotely
+                return content_hash, True
+            # Keep the entry so the next sync retries instead of leaking the remote file
+            logging.warning(f"⚠️ [KB SYNC] Could not delete {entry['file_id']}, will retry next sync: {str(e)}")
+            return content_hash, False
+        return content_hash, True
+
+    failures = []
+    if to_upload:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(contextvars.copy_context().run, upload, h) for h in to_upload]:
+                try:
+                    content_hash, file_id = future.result()
+                except Exception as e:
+                    failures.append(e)
+                    continue
+                rel_path, size, mtime_ns = documents[content_hash]
+                manifest["files"][content_hash] = {
+                    "file_id": file_id,
+                    "path": rel_path,
+                    "size": size,
+                    "mtime_ns": mtime_ns,
+                }
+
+    # Keep path/mtime current for renamed or touched files so the next scan can skip hashing them
+    for content_hash, (rel_path, size, mtime_ns) in documents.items():
+        if content_hash in manifest["files"]:
+            manifest["files"][content_hash].update(path=rel_path, size=size, mtime_ns=mtime_ns)
+
+    if failures:
+        # Remember what did upload so the retry doesn't upload it again
+        save_manifest(manifest_path, manifest)
+        logging.error(f"❌ [KB SYNC] {len(failures)} uploads failed; re-run to retry")
+        raise failures[0]
+
+    file_ids = sorted(entry["file_id"] for h, entry in manifest["files"].items() if h in documents)
+    assistant_id = assistant_id or manifest.get("assistant_id")
+    if assistant_id is None:
+        if create_assistant is None:
+            raise ValueError("No assistant ID given and none stored in the manifest")
+        assistant_id = create_assistant(file_ids).id
+        logging.info(f"🤖 [KB SYNC] Created assistant {assistant_id}")
+    elif file_ids != manifest.get("attached") or assistant_id != manifest.get("assistant_id"):
+        client.beta.assistants.update(assistant_id, file_ids=file_ids)
+        logging.info(f"🔗 [KB SYNC] Attached {len(file_ids)} files to assistant {assistant_id}")
+    else:
+        logging.info(f"✅ [KB SYNC] Assistant {assistant_id} already has the current file set")
+
+    manifest["assistant_id"] = assistant_id
+    manifest["attached"] = file_ids
+    save_manifest(manifest_path, manifest)
+
+    # Stale files are removed only once the assistant no longer references them
+    if stale:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for future in [pool.submit(contextvars.copy_context().run, delete, h) for h in stale]:
+                content_hash, deleted = future.result()
+                if deleted:
+                    del manifest["files"][content_hash]
+        save_manifest(manifest_path, manifest)
+
+    logging.info(f"✅ [KB SYNC] Done in {time.perf_counter() - started:.3f}s")
+    logging.info("=" * 80)
+    return assistant_id
@@ -0,0 +1,216 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import httpx
+
+# Lower value = served first when callers are queued for a slot
+PRIORITIES = {"interactive": 0, "background": 1}
+_priority = contextvars.ContextVar("openai_priority", default="interactive")
+# Mutable [count] installed by `count_api_calls`; shared with pool threads through copied contexts
+_api_calls = contextvars.ContextVar("openai_api_calls", default=None)
+
+
+@contextmanager
+def background_priority():
+    """
+    Mark OpenAI calls made inside this block as background work, so they
+    queue behind replies to guests. The governor is per process: this only
+    orders calls against other work in the same worker, not across workers
+    or separate CLI processes.
+    """
+    token = _priority.set("background")
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def count_api_calls():
+    """
+    Count the OpenAI HTTP requests made inside this block (and in work it
+    hands to thread pools with a copied context). Yields a one-item list.
+    """
+    counter = [0]
+    token = _api_calls.set(counter)
+    try:
+        yield counter
+    finally:
+        _api_calls.reset(token)
+
+
+class ConcurrencyGovernor:
+    """
+    AIMD concurrency limit for OpenAI HTTP calls (per worker process).
+
+    Every successful response raises the limit by 1/limit (about +1 per
+    round-trip of the whole window); a 429 or an exhausted
+    `x-ratelimit-remaining-requests` header halves it, at most once per
+    `decrease_cooldown` so one burst of 429s counts as a single signal.
+    Waiting callers are served by priority, then FIFO.
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=32, decrease_cooldown=1.0):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease_cooldown = decrease_cooldown
+        self.in_flight = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.requests = 0
+        self.wait_ms = deque(maxlen=1000)
+
+    def configure(self, initial, maximum):
+        with self.condition:
+            self.maximum = maximum
+            self.limit = float(max(self.minimum, min(initial, maximum)))
+            self.condition.notify_all()
+
+    def acquire(self, priority="interactive"):
+        started = time.perf_counter()
+        with self.condition:
+            entry = (PRIORITIES.get(priority, 0), next(self.sequence))
+            heapq.heappush(self.waiters, entry)
+            while self.waiters[0] != entry or self.in_flight >= int(self.limit):
+                self.condition.wait()
+            heapq.heappop(self.waiters)
+            self.in_flight += 1
+            # The next waiter may fit as well
+            self.condition.notify_all()
+        self.wait_ms.append((time.perf_counter() - started) * 1000)
+
+    def release(self, status_code=None, headers=None):
+        with self.condition:
+            self.in_flight -= 1
+            self.requests += 1
+            remaining = (headers or {}).get("x-ratelimit-remaining-requests")
+            if status_code == 429 or remaining == "0":
+                self.throttled += 1
+                now = time.monotonic()
+                if now - self.last_decrease >= self.decrease_cooldown:
+                    self.last_decrease = now
+                    self.limit = max(self.minimum, self.limit / 2)
+                    logging.warning(f"🐢 [OPENAI GOVERNOR] Rate limited, concurrency limit lowered to {self.limit:.1f}")
+            elif status_code is not None and status_code < 400:
+                # Don't grow into a limit the API already says is nearly used up
+                if remaining is None or not remaining.isdigit() or int(remaining) > self.limit:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            waits = sorted(self.wait_ms)
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": len(self.waiters),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "queue_wait_p50_ms": round(waits[len(waits) // 2], 2) if waits else None,
+                "queue_wait_p99_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 2) if waits else None,
+                "coalesced": single_flight.coalesced,
+            }
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """
+    httpx transport for the OpenAI client: every HTTP request (including the
+    client's own retries and run polling) takes a governor slot, and the
+    response status/headers drive the AIMD limit.
+    """
+
+    def __init__(self, governor, transport=None):
+        self.governor = governor
+        self.transport = transport or httpx.HTTPTransport()
+
+    def handle_request(self, request):
+        counter = _api_calls.get()
+        if counter is not None:
+            counter[0] += 1
+        self.governor.acquire(_priority.get())
+        status_code, headers = None, None
+        try:
+            response = self.transport.handle_request(request)
+            status_code, headers = response.status_code, response.headers
+            return response
+        finally:
+            self.governor.release(status_code, headers)
+
+    def close(self):
+        self.transport.close()
+
+
+class SingleFlight:
+    """
+    Collapse identical concurrent calls into one: the first caller for a key
+    runs the function, callers arriving while it is in flight wait for and
+    share its result (or exception).
+    """
+
+    class _Call:
+        __slots__ = ("event", "result", "error")
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = self._Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(text):
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub("", text.lower())).strip()
+
+
+# Limits come from app.config via init_governor; defaults cover scripts that never create the app
+governor = ConcurrencyGovernor()
+single_flight = SingleFlight()
+
+
+def init_governor(app):
+    governor.configure(app.config["OPENAI_CONCURRENCY_INITIAL"], app.config["OPENAI_CONCURRENCY_MAX"])
+    logging.info(
+        f"🚦 [OPENAI GOVERNOR] Concurrency limit starts at {governor.limit:.0f} (max {governor.maximum})"
+    )
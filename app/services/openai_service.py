@@ -1,3 +1,4 @@
+import httpx
 from openai import OpenAI
 import shelve
 from dotenv import load_dotenv
@@ -5,45 +6,74 @@ import os
 import time
 import logging
 
+from app.services.openai_governor import GovernedTransport, governor, normalize_question, single_flight
+from app.utils.tracing import span, traced
+
 load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
-client = OpenAI(api_key=OPENAI_API_KEY)
+OPENAI_RUN_TIMEOUT = float(os.getenv("OPENAI_RUN_TIMEOUT", "60"))
+OPENAI_FALLBACK_MODEL = os.getenv("OPENAI_FALLBACK_MODEL", "gpt-3.5-turbo")
+# All API traffic goes through the AIMD concurrency governor
+_http_client = httpx.Client(transport=GovernedTransport(governor))
+client = OpenAI(api_key=OPENAI_API_KEY, http_client=_http_client)
+
+ASSISTANT_INSTRUCTIONS = "You're a helpful WhatsApp assistant that can assist guests that are staying in our Paris AirBnb. Use your knowledge base to best respond to customer queries. If you don't know the answer, say simply that you cannot help with question and advice to contact the host directly. Be friendly and funny."
+
+
+def configure_client(api_key, assistant_id, run_timeout=None, fallback_model=None):
+    """
+    Swap in a client for a rotated API key and/or assistant ID (hot config
+    reload). The new client shares the pooled HTTP client, so warm
+    connections are kept; calls already in progress finish on the old one.
+    """
+    global client, OPENAI_API_KEY, OPENAI_ASSISTANT_ID, OPENAI_RUN_TIMEOUT, OPENAI_FALLBACK_MODEL
+    if api_key != OPENAI_API_KEY:
+        client = OpenAI(api_key=api_key, http_client=_http_client)
+        OPENAI_API_KEY = api_key
+    OPENAI_ASSISTANT_ID = assistant_id
+    OPENAI_RUN_TIMEOUT = run_timeout or OPENAI_RUN_TIMEOUT
+    OPENAI_FALLBACK_MODEL = fallback_model or OPENAI_FALLBACK_MODEL
 
 
 def upload_file(path):
     # Upload a file with an "assistants" purpose
-    file = client.files.create(
-        file=open("../../data/airbnb-faq.pdf", "rb"), purpose="assistants"
-    )
+    with open(path, "rb") as f:
+        file = client.files.create(file=f, purpose="assistants")
+    return file
 
 
-def create_assistant(file):
+def create_assistant(file_ids):
     """
     You currently cannot set the temperature for Assistant via the API.
+    Use `start/sync_knowledge_base.py` rather than calling this directly, so the
+    assistant is created once and reused.
     """
     assistant = client.beta.assistants.create(
         name="WhatsApp AirBnb Assistant",
-        instructions="You're a helpful WhatsApp assistant that can assist guests that are staying in our Paris AirBnb. Use your knowledge base to best respond to customer queries. If you don't know the answer, say simply that you cannot help with question and advice to contact the host directly. Be friendly and funny.",
+        instructions=ASSISTANT_INSTRUCTIONS,
         tools=[{"type": "retrieval"}],
         model="gpt-4-1106-preview",
-        file_ids=[file.id],
+        file_ids=file_ids,
     )
     return assistant
 
 
 # Use context manager to ensure the shelf file is closed properly
+@traced("threads_db.get")
 def check_if_thread_exists(wa_id):
     with shelve.open("threads_db") as threads_shelf:
         return threads_shelf.get(wa_id, None)
 
 
+@traced("threads_db.store")
 def store_thread(wa_id, thread_id):
     with shelve.open("threads_db", writeback=True) as threads_shelf:
         threads_shelf[wa_id] = thread_id
 
 
-def run_assistant(thread, name):
+@traced("run_assistant")
+def run_assistant(thread, name, cancel_event=None, timeout=None):
     # Retrieve the Assistant
     assistant = client.beta.assistants.retrieve(OPENAI_ASSISTANT_ID)
 
@@ -56,10 +86,19 @@ def run_assistant(thread, name):
 
     # Wait for completion
     # https://platform.openai.com/docs/assistants/how-it-works/runs-and-run-steps#:~:text=under%20failed_at.-,Polling%20for%20updates,-In%20order%20to
-    while run.status != "completed":
-        # Be nice to the API
-        time.sleep(0.5)
-        run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
+    timeout = timeout or OPENAI_RUN_TIMEOUT
+    deadline = time.monotonic() + timeout
+    with span("run_assistant.poll"):
+        while run.status != "completed":
+            if run.status in ("failed", "cancelled", "expired"):
+                raise RuntimeError(f"Assistant run {run.id} ended with status '{run.status}'")
+            if (cancel_event is not None and cancel_event.is_set()) or time.monotonic() >= deadline:
+                # Stop the run so it doesn't keep consuming tokens after we gave up on it
+                client.beta.threads.runs.cancel(thread_id=thread.id, run_id=run.id)
+                raise TimeoutError(f"Assistant run {run.id} abandoned (cancelled or past {timeout}s deadline)")
+            # Be nice to the API
+            time.sleep(0.5)
+            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
 
     # Retrieve the Messages
     messages = client.beta.threads.messages.list(thread_id=thread.id)
@@ -68,7 +107,8 @@ def run_assistant(thread, name):
     return new_message
 
 
-def generate_response(message_body, wa_id, name):
+@traced("generate_response")
+def generate_response(message_body, wa_id, name, cancel_event=None):
     # Check if there is already a thread_id for the wa_id
     thread_id = check_if_thread_exists(wa_id)
 
@@ -92,6 +132,34 @@ def generate_response(message_body, wa_id, name):
     )
 
     # Run the assistant and get the new message
-    new_message = run_assistant(thread, name)
+    new_message = run_assistant(thread, name, cancel_event=cancel_event)
+
+    return new_message
+
+
+@traced("generate_quick_response")
+def generate_quick_response(message_body, name):
+    """
+    Single chat completion with a cheaper model and no thread or knowledge base.
+    Used as a backup path when the assistant is too slow.
+
+    The answer depends only on the question, so identical questions that are
+    in flight at the same time share one API call.
+    """
 
+    def complete():
+        completion = client.chat.completions.create(
+            model=OPENAI_FALLBACK_MODEL,
+            messages=[
+                {"role": "system", "content": ASSISTANT_INSTRUCTIONS},
+                {"role": "user", "content": message_body},
+            ],
+            timeout=10,
+        )
+        return completion.choices[0].message.content
+
+    question = normalize_question(message_body)
+    # Emoji- or punctuation-only messages all normalize to "" and must not share an answer
+    new_message = single_flight.do((OPENAI_FALLBACK_MODEL, question), complete) if question else complete()
+    logging.info(f"Generated quick message: {new_message}")
     return new_message
@@ -0,0 +1,245 @@
+import contextvars
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from flask import current_app
+
+from app.utils.tracing import sampled_thread
+
+# Generators run here so the request thread can keep track of the latency budget.
+# Created on first use so it is sized from app.config (RESPONSE_WORKERS).
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(config):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config["RESPONSE_WORKERS"], thread_name_prefix="response")
+        return _executor
+
+
+# --------------------------------------------------------------
+# Response engines
+# --------------------------------------------------------------
+# Every engine takes (message_body, wa_id, name, cancel_event) and returns the
+# reply text, or None if it has no answer. Engines should check `cancel_event`
+# where they can so losing paths stop early.
+
+
+def _echo_engine(message_body, wa_id, name, cancel_event):
+    from app.utils.whatsapp_utils import generate_response
+
+    return generate_response(message_body)
+
+
+def _openai_engine(message_body, wa_id, name, cancel_event):
+    # Imported lazily: the OpenAI client is only created when this engine is used
+    from app.services.openai_service import generate_response
+    from app.utils.whatsapp_utils import process_text_for_whatsapp
+
+    return process_text_for_whatsapp(generate_response(message_body, wa_id, name, cancel_event=cancel_event))
+
+
+def _quick_model_engine(message_body, wa_id, name, cancel_event):
+    from app.services.openai_service import generate_quick_response
+    from app.utils.whatsapp_utils import process_text_for_whatsapp
+
+    return process_text_for_whatsapp(generate_quick_response(message_body, name))
+
+
+_faq_cache = {}
+_WORD = re.compile(r"\w{3,}")
+
+
+def _load_faq(path):
+    mtime = os.path.getmtime(path)
+    cached = _faq_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        cached = (mtime, [(set(_WORD.findall(e["question"].lower())), e["answer"]) for e in entries])
+        _faq_cache[path] = cached
+    return cached[1]
+
+
+def faq_lookup(message_body, path, min_score=0.3):
+    """
+    Best matching answer from a JSON list of {"question", "answer"} entries,
+    by word overlap with the question. None if nothing is close enough.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    words = set(_WORD.findall(message_body.lower()))
+    if not words:
+        return None
+    best_score, best_answer = 0.0, None
+    for question_words, answer in _load_faq(path):
+        union = words | question_words
+        score = len(words & question_words) / len(union) if union else 0.0
+        if score > best_score:
+            best_score, best_answer = score, answer
+    return best_answer if best_score >= min_score else None
+
+
+def _faq_engine(message_body, wa_id, name, cancel_event, path=None):
+    return faq_lookup(message_body, path)
+
+
+ENGINES = {
+    "echo": _echo_engine,
+    "openai": _openai_engine,
+    "quick_model": _quick_model_engine,
+    "faq": _faq_engine,
+}
+
+# Not an engine: sends RESPONSE_HOLDING_TEXT after hedging and keeps waiting for the real answer
+HOLDING_PATH = "holding"
+# Give fast backups (e.g. the FAQ lookup) this long to answer before sending the holding reply
+HOLDING_GRACE = 0.25
+
+
+# --------------------------------------------------------------
+# Outcome statistics
+# --------------------------------------------------------------
+
+
+class OrchestratorStats:
+    """
+    Which path produced the reply and how long it took, kept in memory per worker.
+    """
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.wins = Counter()
+        self.latencies = {}
+        self.window = window
+
+    def record(self, winner, latency_ms):
+        with self.lock:
+            self.wins[winner] += 1
+            self.latencies.setdefault(winner, deque(maxlen=self.window)).append(latency_ms)
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for winner, count in self.wins.items():
+                values = sorted(self.latencies[winner])
+                result[winner] = {
+                    "count": count,
+                    "p50_ms": round(values[len(values) // 2], 1),
+                    "p95_ms": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+                    "max_ms": round(values[-1], 1),
+                }
+            return result
+
+
+stats = OrchestratorStats()
+
+
+# --------------------------------------------------------------
+# Orchestration
+# --------------------------------------------------------------
+
+
+def run_engine(engine_name, message_body, wa_id, name, cancel_event, config):
+    kwargs = {"path": config["FAQ_PATH"]} if engine_name == "faq" else {}
+    return ENGINES[engine_name](message_body, wa_id, name, cancel_event, **kwargs)
+
+
+def _run_sampled(*args):
+    # Pool threads show up in the request's slow-request profile while they work for it
+    with sampled_thread():
+        return run_engine(*args)
+
+
+def _submit(engine_name, message_body, wa_id, name, cancel_event, config):
+    # Copy the context so trace spans, log IDs and profiling follow the work into the pool
+    context = contextvars.copy_context()
+    return _get_executor(config).submit(
+        context.run, _run_sampled, engine_name, message_body, wa_id, name, cancel_event, config
+    )
+
+
+def generate_response_within_budget(message_body, wa_id, name, send_interim=None):
+    """
+    Produce a reply within RESPONSE_BUDGET_MS.
+
+    The primary engine (RESPONSE_ENGINE) starts immediately. If it has not
+    answered by RESPONSE_HEDGE_MS (or it fails), the backup paths in
+    RESPONSE_BACKUPS are started; `holding` sends RESPONSE_HOLDING_TEXT through
+    `send_interim` and keeps waiting. The first non-empty answer wins and the
+    other paths are told to stop. Returns (text, winner); text is None if
+    nothing answered within the budget.
+    """
+    config = current_app.config
+    started = time.perf_counter()
+    budget_deadline = started + config["RESPONSE_BUDGET_MS"] / 1000
+    hedge_deadline = started + config["RESPONSE_HEDGE_MS"] / 1000
+    cancel_event = threading.Event()
+
+    primary = config["RESPONSE_ENGINE"]
+    pending = {_submit(primary, message_body, wa_id, name, cancel_event, config): primary}
+    backups = [b for b in config["RESPONSE_BACKUPS"] if b != primary]
+    hedged = False
+    holding_deadline = None
+    text, winner = None, "timeout"
+
+    try:
+        while pending:
+            now = time.perf_counter()
+            if now >= budget_deadline:
+                break
+            if not hedged:
+                next_deadline = hedge_deadline
+            elif holding_deadline is not None:
+                next_deadline = min(holding_deadline, budget_deadline)
+            else:
+                next_deadline = budget_deadline
+            done, _ = wait(list(pending), timeout=max(0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                path = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logging.warning(f"⚠️ [ORCHESTRATOR] Path '{path}' failed: {str(e)}")
+                    continue
+                if result:
+                    text, winner = result, path
+                    break
+            if text is not None:
+                break
+
+            # Hedge when the primary is late or has already failed without an answer
+            if not hedged and (time.perf_counter() >= hedge_deadline or not pending):
+                hedged = True
+                for backup in backups:
+                    if backup == HOLDING_PATH:
+                        if send_interim is not None:
+                            holding_deadline = time.perf_counter() + HOLDING_GRACE
+                    elif backup in ENGINES:
+                        logging.info(f"🔀 [ORCHESTRATOR] Hedging with backup path '{backup}'")
+                        pending[_submit(backup, message_body, wa_id, name, cancel_event, config)] = backup
+
+            if holding_deadline is not None and pending and time.perf_counter() >= holding_deadline:
+                holding_deadline = None
+                logging.info("⏳ [ORCHESTRATOR] Still no answer, sending holding reply")
+                send_interim(config["RESPONSE_HOLDING_TEXT"])
+    finally:
+        # Tell the losers to stop and drop any that haven't started yet
+        cancel_event.set()
+        for future in pending:
+            future.cancel()
+
+    latency_ms = (time.perf_counter() - started) * 1000
+    stats.record(winner, latency_ms)
+    logging.info(f"🏁 [ORCHESTRATOR] winner={winner} latency={latency_ms:.0f}ms hedged={hedged}")
+    return text, winner
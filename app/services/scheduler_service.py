@@ -0,0 +1,407 @@
+import fcntl
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+# Pending messages live in SQLite. The partial index on due_at over pending
+# rows is a B-tree, so schedule, cancel and "next due" are all O(log n) and
+# the store survives restarts. Only rows still pending can be cancelled or
+# rescheduled, and `key` is unique among pending rows so a caller can keep
+# replacing e.g. a guest's follow-up reminder. A message WhatsApp definitely
+# did not accept (429, 5xx) goes back to pending with a later due_at until
+# `attempts` reaches the scheduler's max_attempts.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    due_at REAL NOT NULL,
+    wa_id TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    key TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_pending_due ON scheduled_messages (due_at) WHERE status = 'pending';
+CREATE UNIQUE INDEX IF NOT EXISTS idx_scheduled_pending_key ON scheduled_messages (key) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_scheduled_finished ON scheduled_messages (finished_at) WHERE finished_at IS NOT NULL;
+"""
+
+
+class SchedulerStore:
+    """
+    Persistent store of scheduled messages. Safe to use from any worker
+    process; each process and thread gets its own connection.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        with self._connection() as connection:
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(scheduled_messages)")}
+            if "attempts" not in columns:
+                # Databases created before retries were added
+                connection.execute("ALTER TABLE scheduled_messages ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+    def schedule(self, wa_id, payload, due_at, key=None):
+        """
+        Schedule `payload` (bytes from app.utils.outbound_messages) for `due_at`
+        (epoch seconds). With a `key`, an existing pending message with the
+        same key is replaced instead. Returns the message ID.
+        """
+        connection = self._connection()
+        now = time.time()
+        if key is None:
+            cursor = connection.execute(
+                "INSERT INTO scheduled_messages (due_at, wa_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                (due_at, wa_id, payload, now),
+            )
+            return cursor.lastrowid
+        row = connection.execute(
+            "INSERT INTO scheduled_messages (due_at, wa_id, payload, key, created_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (key) WHERE status = 'pending' "
+            "DO UPDATE SET due_at = excluded.due_at, wa_id = excluded.wa_id, payload = excluded.payload "
+            "RETURNING id",
+            (due_at, wa_id, payload, key, now),
+        ).fetchone()
+        return row[0]
+
+    def schedule_many(self, messages):
+        """Bulk insert of (wa_id, payload, due_at) tuples in one transaction."""
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "INSERT INTO scheduled_messages (due_at, wa_id, payload, created_at) VALUES (?, ?, ?, ?)",
+                ((due_at, wa_id, payload, now) for wa_id, payload, due_at in messages),
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def cancel(self, message_id=None, key=None):
+        """Cancel a pending message by ID or key. Returns True if one was cancelled."""
+        column, value = ("id", message_id) if message_id is not None else ("key", key)
+        cursor = self._connection().execute(
+            f"UPDATE scheduled_messages SET status = 'cancelled', finished_at = ? "
+            f"WHERE {column} = ? AND status = 'pending'",
+            (time.time(), value),
+        )
+        return cursor.rowcount > 0
+
+    def next_due(self):
+        row = self._connection().execute(
+            "SELECT MIN(due_at) FROM scheduled_messages WHERE status = 'pending'"
+        ).fetchone()
+        return row[0]
+
+    def claim_due(self, now, limit):
+        """
+        Atomically move up to `limit` due messages from pending to sending and
+        return them. The claim is committed before anything is sent.
+        """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            rows = connection.execute(
+                "SELECT id, wa_id, payload, attempts FROM scheduled_messages "
+                "WHERE status = 'pending' AND due_at <= ? ORDER BY due_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE scheduled_messages SET status = 'sending' WHERE id = ?", ((row[0],) for row in rows)
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return rows
+
+    def finish(self, results, retries=()):
+        """
+        Record (message_id, status, error) outcomes and put (message_id,
+        due_at, error) retries back to pending, in one transaction.
+        """
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN")
+        try:
+            connection.executemany(
+                "UPDATE scheduled_messages SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                ((status, error, now, message_id) for message_id, status, error in results),
+            )
+            for message_id, due_at, error in retries:
+                try:
+                    connection.execute(
+                        "UPDATE scheduled_messages SET status = 'pending', due_at = ?, attempts = attempts + 1, "
+                        "error = ? WHERE id = ?",
+                        (due_at, error, message_id),
+                    )
+                except sqlite3.IntegrityError:
+                    # A new message with the same key was scheduled while this one was sending
+                    connection.execute(
+                        "UPDATE scheduled_messages SET status = 'cancelled', error = 'replaced before retry', "
+                        "finished_at = ? WHERE id = ?",
+                        (now, message_id),
+                    )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def recover_interrupted(self):
+        """
+        Messages left in 'sending' by a crashed owner may or may not have been
+        delivered. They are marked 'unknown' and never resent.
+        """
+        cursor = self._connection().execute(
+            "UPDATE scheduled_messages SET status = 'unknown', finished_at = ?, "
+            "error = 'interrupted while sending' WHERE status = 'sending'",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+    def purge_finished(self, older_than):
+        cursor = self._connection().execute(
+            "DELETE FROM scheduled_messages WHERE finished_at IS NOT NULL AND finished_at < ?", (older_than,)
+        )
+        return cursor.rowcount
+
+    def counts(self):
+        return dict(
+            self._connection().execute("SELECT status, COUNT(*) FROM scheduled_messages GROUP BY status").fetchall()
+        )
+
+
+class MessageScheduler:
+    """
+    Fires due messages in batches through `send` (a callable taking the
+    payload bytes and returning the HTTP status code).
+
+    2xx is sent and other 4xx failed. 429 and 5xx mean WhatsApp did not take
+    the message, so it is retried after `retry_backoff` seconds, doubling per
+    attempt, up to `max_attempts` sends. A requests exception (timeout,
+    connection error) may hide a delivered message and is recorded as
+    'unknown', never resent.
+
+    Only the process holding an exclusive lock on `lock_path` runs the firing
+    loop; the others keep retrying the lock so a new owner takes over if the
+    current one dies. Every process can still schedule and cancel.
+    """
+
+    def __init__(
+        self,
+        store,
+        send,
+        lock_path,
+        batch_size=100,
+        concurrency=8,
+        poll_interval=1.0,
+        retention_days=7,
+        max_attempts=5,
+        retry_backoff=30.0,
+    ):
+        self.store = store
+        self.send = send
+        self.lock_path = lock_path
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+        self.retention = retention_days * 86400
+        self.executor = None
+        self.concurrency = concurrency
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.lock_file = None
+        self.owner = False
+        self.fired = 0
+        self.failed = 0
+        self.retried = 0
+        self.pid = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._run, name="message-scheduler", daemon=True).start()
+
+    def _after_fork(self):
+        # A forked worker inherits the parent's state but not its threads; it
+        # competes for the lock with its own file handle
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        if self.lock_file is not None:
+            # Don't keep the parent's lock alive after the parent exits
+            self.lock_file.close()
+            self.lock_file = None
+        self.owner = False
+        self.executor = None
+        self.start()
+
+    def notify(self):
+        """Wake the firing loop early, e.g. after scheduling a message due soon."""
+        self.wakeup.set()
+
+    def _try_lock(self):
+        lock_file = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def _run(self):
+        while not self.stopped.is_set():
+            if self._try_lock():
+                break
+            # Another worker owns the scheduler; check again in case it goes away
+            self.stopped.wait(max(self.poll_interval, 5.0))
+        else:
+            return
+
+        self.owner = True
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="scheduler-send")
+        interrupted = self.store.recover_interrupted()
+        logging.info(f"⏰ [SCHEDULER] This worker (pid {os.getpid()}) owns the scheduler")
+        if interrupted:
+            logging.warning(f"⚠️ [SCHEDULER] {interrupted} messages were mid-send at last shutdown; marked unknown, not resent")
+
+        last_purge = 0.0
+        while not self.stopped.is_set():
+            try:
+                fired = self.fire_due()
+                if time.time() - last_purge > 3600:
+                    last_purge = time.time()
+                    self.store.purge_finished(time.time() - self.retention)
+            except Exception as e:
+                logging.error(f"❌ [SCHEDULER] Firing loop error: {str(e)}", exc_info=True)
+                fired = 0
+            if fired == self.batch_size:
+                continue  # More may be due right now
+            next_due = self.store.next_due()
+            delay = self.poll_interval if next_due is None else min(self.poll_interval, next_due - time.time())
+            if delay > 0:
+                self.wakeup.wait(delay)
+            self.wakeup.clear()
+
+    def fire_due(self, now=None):
+        """Claim and send one batch of due messages. Returns how many were claimed."""
+        rows = self.store.claim_due(now or time.time(), self.batch_size)
+        if not rows:
+            return 0
+
+        def send_one(row):
+            message_id, wa_id, payload, attempts = row
+            try:
+                status_code = self.send(payload)
+            except requests.RequestException as e:
+                # The request may or may not have reached WhatsApp; resending could double-send
+                return message_id, ("unknown", str(e)[:200])
+            except Exception as e:
+                return message_id, ("failed", str(e)[:200])
+            if 200 <= status_code < 300:
+                return message_id, ("sent", None)
+            if status_code == 429 or status_code >= 500:
+                if attempts + 1 < self.max_attempts:
+                    return message_id, ("retry", f"HTTP {status_code}")
+                return message_id, ("failed", f"HTTP {status_code} after {attempts + 1} attempts")
+            return message_id, ("failed", f"HTTP {status_code}")
+
+        if self.executor is not None and len(rows) > 1:
+            outcomes = list(self.executor.map(send_one, rows))
+        else:
+            outcomes = [send_one(row) for row in rows]
+        attempts = {row[0]: row[3] for row in rows}
+        retry_at = time.time()
+        self.store.finish(
+            [(message_id, status, error) for message_id, (status, error) in outcomes if status != "retry"],
+            [
+                (message_id, retry_at + self.retry_backoff * 2 ** attempts[message_id], error)
+                for message_id, (status, error) in outcomes
+                if status == "retry"
+            ],
+        )
+        sent = sum(1 for _, (status, _) in outcomes if status == "sent")
+        retried = sum(1 for _, (status, _) in outcomes if status == "retry")
+        self.fired += sent
+        self.retried += retried
+        self.failed += len(outcomes) - sent - retried
+        logging.info(f"⏰ [SCHEDULER] Fired {len(rows)} scheduled messages ({sent} sent, {retried} to retry)")
+        return len(rows)
+
+    def snapshot(self):
+        return {
+            "owner": self.owner,
+            "fired": self.fired,
+            "failed": self.failed,
+            "retried": self.retried,
+            "counts": self.store.counts(),
+        }
+
+
+def init_scheduler(app):
+    """
+    Attach a MessageScheduler to the app when SCHEDULER_DB is configured.
+    Scheduled payloads are posted with the current settings snapshot.
+    """
+    path = app.config["SCHEDULER_DB"]
+    if not path:
+        return None
+    from app.services.settings_service import current_settings
+
+    # send_message hides the status code the retry decision needs
+    session = requests.Session()
+
+    def send(payload):
+        with app.app_context():
+            settings = current_settings()
+        response = session.post(
+            f"https://graph.facebook.com/{settings['VERSION']}/{settings['PHONE_NUMBER_ID']}/messages",
+            data=payload,
+            headers={"Content-type": "application/json", "Authorization": f"Bearer {settings['ACCESS_TOKEN']}"},
+            timeout=10,
+        )
+        if response.status_code >= 400:
+            logging.error(f"❌ [SCHEDULER] HTTP {response.status_code} from WhatsApp API: {response.text[:200]}")
+        return response.status_code
+
+    scheduler = MessageScheduler(
+        SchedulerStore(path),
+        send,
+        lock_path=f"{path}.lock",
+        batch_size=app.config["SCHEDULER_BATCH_SIZE"],
+    )
+    app.extensions["scheduler"] = scheduler
+
+    # Started right away so due messages fire after a restart even without
+    # inbound traffic, and again in every process forked from this one
+    # (gunicorn --preload)
+    scheduler.start()
+    os.register_at_fork(after_in_child=scheduler._after_fork)
+
+    logging.info(f"⏰ [SCHEDULER] Scheduled messages enabled ({path})")
+    return scheduler
@@ -0,0 +1,250 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+from dotenv import dotenv_values
+from flask import current_app
+
+from app.config import ENV_FILE, PROCESS_ENVIRON, RESTART_REQUIRED, read_settings
+from app.services.response_service import ENGINES, HOLDING_PATH
+
+# A reload may change these but never blank them: an empty value is far more
+# likely a half-written env file than an intentional change
+REQUIRED_ONCE_SET = ("ACCESS_TOKEN", "APP_SECRET", "VERIFY_TOKEN", "VERSION", "PHONE_NUMBER_ID")
+
+
+def validate_settings(settings, current):
+    """
+    Raise ValueError if a freshly read settings dict must not replace
+    `current`.
+    """
+    for key in REQUIRED_ONCE_SET:
+        if current.get(key) and not settings[key]:
+            raise ValueError(f"{key} would be unset")
+    if settings["RESPONSE_ENGINE"] not in ENGINES:
+        raise ValueError(f"Unknown RESPONSE_ENGINE '{settings['RESPONSE_ENGINE']}'")
+    for backup in settings["RESPONSE_BACKUPS"]:
+        if backup not in ENGINES and backup != HOLDING_PATH:
+            raise ValueError(f"Unknown backup path '{backup}' in RESPONSE_BACKUPS")
+    if settings["RESPONSE_BUDGET_MS"] <= 0 or settings["RESPONSE_HEDGE_MS"] < 0:
+        raise ValueError("RESPONSE_BUDGET_MS must be positive and RESPONSE_HEDGE_MS non-negative")
+
+
+class SettingsReloader:
+    """
+    Re-reads the env file when it changes (or on SIGHUP / an admin request),
+    validates the result and swaps it in without restarting the worker.
+
+    Each reload builds a complete new settings dict and publishes it as an
+    immutable snapshot (`current_settings()`); code that needs several related
+    values (token, API version, phone number ID) reads the snapshot once, so it
+    never mixes two generations. The snapshot is also copied into app.config
+    with a single dict.update for code that reads one key at a time. Settings in RESTART_REQUIRED are captured at
+    startup by other components, so changes to them are reported and left
+    alone. Clients derived from settings (OpenAI client, forwarding HMAC key)
+    are rebuilt by callbacks registered with `on_change`.
+    """
+
+    def __init__(self, app, env_file, poll_interval=2.0):
+        self.app = app
+        self.env_file = env_file
+        self.poll_interval = poll_interval
+        self.current = MappingProxyType(read_settings(os.environ))
+        # Keys load_dotenv took from the file at startup (the process environment wins otherwise)
+        self.file_keys = set(self._read_file()) - set(PROCESS_ENVIRON)
+        self.observed = self._stat()
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.requested = threading.Event()
+        self.generation = 0
+        self.pid = None
+        self.last_reload = None
+
+    def on_change(self, keys, callback):
+        """Call `callback(settings)` after a reload that changed any of `keys`."""
+        self.callbacks.append((frozenset(keys), callback))
+
+    def _stat(self):
+        try:
+            st = os.stat(self.env_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _read_file(self):
+        if not os.path.exists(self.env_file):
+            return {}
+        return {k: v for k, v in dotenv_values(self.env_file).items() if v is not None}
+
+    def start(self):
+        # Started lazily from the first request so the thread exists after gunicorn forks
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            self.pid = os.getpid()
+            threading.Thread(target=self._watch, name="settings-reload", daemon=True).start()
+
+    def request_reload(self):
+        """
+        Signal-safe: only sets an event, which the watcher thread started by
+        the first request picks up and reloads.
+        """
+        self.requested.set()
+
+    def _watch(self):
+        changed = False
+        while True:
+            if self.requested.wait(self.poll_interval if self.poll_interval > 0 else None):
+                self.requested.clear()
+                self.reload("signal")
+                continue
+            stat = self._stat()
+            if stat != self.observed:
+                # Wait for the file to stop changing before reading it
+                self.observed = stat
+                changed = True
+            elif changed:
+                changed = False
+                self.reload("file change")
+
+    def reload(self, source):
+        """Re-read and apply the env file. Returns the reload status dict."""
+        with self.lock:
+            started = time.perf_counter()
+            status = {"source": source, "at": time.time(), "changed": [], "restart_required": []}
+            try:
+                file_values = self._read_file()
+                environ = {k: v for k, v in os.environ.items() if k not in self.file_keys}
+                file_keys = set()
+                for key, value in file_values.items():
+                    if key not in environ:
+                        environ[key] = value
+                        file_keys.add(key)
+                settings = read_settings(environ)
+                validate_settings(settings, self.current)
+            except Exception as e:
+                status.update(status="rejected", error=f"{type(e).__name__}: {str(e)}")
+                logging.error(f"❌ [CONFIG RELOAD] Rejected {self.env_file} ({source}): {status['error']}")
+                return self._finish(status, started)
+
+            changed = {key for key, value in settings.items() if self.current.get(key) != value}
+            restart_required = changed & RESTART_REQUIRED
+            for key in restart_required:
+                settings[key] = self.current[key]
+            applied = changed - restart_required
+
+            # Swap: environment (for modules that read os.environ lazily), snapshot, app.config
+            for key in self.file_keys - file_keys:
+                os.environ.pop(key, None)
+            for key in file_keys:
+                os.environ[key] = environ[key]
+            self.file_keys = file_keys
+            self.current = MappingProxyType(settings)
+            self.app.config.update({key: settings[key] for key in applied})
+            self.generation += 1
+
+            errors = []
+            for keys, callback in self.callbacks:
+                if keys & applied:
+                    try:
+                        callback(self.current)
+                    except Exception as e:
+                        errors.append(f"{getattr(callback, '__name__', callback)}: {str(e)}")
+                        logging.error(f"❌ [CONFIG RELOAD] Rebuilding dependent client failed: {str(e)}", exc_info=True)
+
+            status.update(
+                status="error" if errors else "ok",
+                error="; ".join(errors) or None,
+                changed=sorted(applied),
+                restart_required=sorted(restart_required),
+            )
+            logging.info(
+                f"🔁 [CONFIG RELOAD] {source}: {len(applied)} settings changed"
+                f"{' (' + ', '.join(sorted(applied)) + ')' if applied else ''}"
+            )
+            if restart_required:
+                logging.warning(f"⚠️ [CONFIG RELOAD] Restart needed to apply: {', '.join(sorted(restart_required))}")
+            return self._finish(status, started)
+
+    def _finish(self, status, started):
+        status["duration_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        status["generation"] = self.generation
+        self.last_reload = status
+        return status
+
+    def snapshot(self):
+        return {
+            "env_file": self.env_file,
+            "pid": os.getpid(),
+            "generation": self.generation,
+            "watching": self.poll_interval > 0,
+            "last_reload": self.last_reload,
+        }
+
+
+def current_settings():
+    """
+    The current immutable settings snapshot. Read it once per operation and
+    take every related value from it, so a reload in between can't mix an old
+    token with a new phone number ID.
+    """
+    return current_app.extensions["settings"].current
+
+
+def _rebuild_openai_client(settings):
+    # Not imported yet means it will read the refreshed os.environ when it is
+    if "app.services.openai_service" in sys.modules:
+        from app.services.openai_service import configure_client
+
+        configure_client(
+            settings["OPENAI_API_KEY"],
+            settings["OPENAI_ASSISTANT_ID"],
+            settings["OPENAI_RUN_TIMEOUT"],
+            settings["OPENAI_FALLBACK_MODEL"],
+        )
+
+
+def init_settings_reload(app):
+    """
+    Attach a SettingsReloader to the app. The env file is polled every
+    CONFIG_WATCH_SECONDS (0 = only reload on SIGHUP or POST /admin/config/reload).
+    """
+    reloader = SettingsReloader(app, ENV_FILE, poll_interval=app.config["CONFIG_WATCH_SECONDS"])
+    # Fail fast on the checks a reload would apply, e.g. a typo in RESPONSE_ENGINE
+    try:
+        validate_settings(reloader.current, {})
+    except ValueError as e:
+        logging.critical(f"❌ [CONFIG] Invalid configuration in {ENV_FILE}: {str(e)}")
+        raise
+    reloader.on_change(
+        {"OPENAI_API_KEY", "OPENAI_ASSISTANT_ID", "OPENAI_RUN_TIMEOUT", "OPENAI_FALLBACK_MODEL"}, _rebuild_openai_client
+    )
+
+    def resign_forwarded(settings):
+        forwarder = app.extensions.get("forwarder")
+        if forwarder is not None:
+            forwarder.secret = settings["APP_SECRET"] or ""
+
+    reloader.on_change({"APP_SECRET"}, resign_forwarded)
+
+    app.extensions["settings"] = reloader
+
+    # Under gunicorn, SIGHUP to the master restarts workers; send it to a worker to reload in place
+    if hasattr(signal, "SIGHUP") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGHUP, lambda signum, frame: reloader.request_reload())
+
+    # The watcher also serves SIGHUP, so it runs even when the file isn't polled
+    @app.before_request
+    def start_settings_watch():
+        reloader.start()
+
+    logging.info(
+        f"🔁 [CONFIG RELOAD] Hot reload enabled for {ENV_FILE} "
+        f"({'polled every ' + str(reloader.poll_interval) + 's, ' if reloader.poll_interval > 0 else ''}SIGHUP)"
+    )
+    return reloader
@@ -0,0 +1,194 @@
+import contextvars
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.openai_governor import background_priority, count_api_calls
+from app.services.response_service import ENGINES, run_engine
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shadow_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    message_id TEXT,
+    message TEXT,
+    primary_engine TEXT,
+    primary_winner TEXT,
+    primary_latency_ms REAL,
+    primary_api_calls INTEGER,
+    primary_output TEXT,
+    candidate_engine TEXT,
+    candidate_latency_ms REAL,
+    candidate_api_calls INTEGER,
+    candidate_output TEXT,
+    candidate_error TEXT
+)
+"""
+
+
+class ShadowStore:
+    """
+    Side-by-side results in a local SQLite file. One connection per process,
+    WAL mode so several gunicorn workers can append concurrently.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = None
+        self.pid = None
+
+    def _connect(self):
+        # Connected lazily so a connection is never shared across a gunicorn fork
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(SCHEMA)
+            self.connection.commit()
+        return self.connection
+
+    def add(self, row):
+        with self.lock:
+            self._connect().execute(
+                f"INSERT INTO shadow_results ({', '.join(row)}) VALUES ({', '.join('?' * len(row))})",
+                list(row.values()),
+            )
+            self.connection.commit()
+
+
+class ShadowMirror:
+    """
+    Mirrors a fraction of inbound messages to a candidate engine.
+
+    The candidate's output is only stored, never sent. Shadow work is strictly
+    bounded: at most `max_in_flight` shadow calls run at once and a message is
+    simply not mirrored when that budget is used up, so the primary path never
+    waits on it. Shadow OpenAI calls also run at background priority in the
+    concurrency governor, and use a separate thread namespace per user so the
+    guest's real conversation is untouched.
+    """
+
+    def __init__(self, engine, fraction, store, max_in_flight=2, timeout=30.0):
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown shadow engine '{engine}', expected one of {', '.join(ENGINES)}")
+        self.engine = engine
+        self.fraction = fraction
+        self.store = store
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="shadow")
+        self.lock = threading.Lock()
+        self.mirrored = 0
+        self.skipped = 0
+        self.errors = 0
+
+    def sampled(self, message_id):
+        # Hash-based so a replayed message makes the same decision
+        return zlib.crc32(message_id.encode("utf-8")) % 10000 < self.fraction * 10000
+
+    def maybe_mirror(self, message_id, message_body, wa_id, name, primary, config):
+        """
+        `primary` holds the primary path's engine, winner, latency_ms,
+        api_calls and output for the same message.
+        """
+        if not self.sampled(message_id):
+            return False
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.skipped += 1
+            logging.debug("👥 [SHADOW] Shadow budget in use, not mirroring this message")
+            return False
+        context = contextvars.copy_context()
+        try:
+            self.executor.submit(
+                context.run, self._run, message_id, message_body, wa_id, name, primary, dict(config)
+            )
+        except Exception:
+            self.slots.release()
+            raise
+        return True
+
+    def _run(self, message_id, message_body, wa_id, name, primary, config):
+        cancel_event = threading.Event()
+        timer = threading.Timer(self.timeout, cancel_event.set)
+        timer.start()
+        output, error = None, None
+        api_calls = [0]
+        started = time.perf_counter()
+        try:
+            with background_priority(), count_api_calls() as api_calls:
+                output = run_engine(self.engine, message_body, f"shadow:{wa_id}", name, cancel_event, config)
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            with self.lock:
+                self.errors += 1
+        finally:
+            timer.cancel()
+            latency_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            self.store.add(
+                {
+                    "created_at": time.time(),
+                    "message_id": message_id,
+                    "message": message_body,
+                    "primary_engine": primary["engine"],
+                    "primary_winner": primary["winner"],
+                    "primary_latency_ms": primary["latency_ms"],
+                    "primary_api_calls": primary["api_calls"],
+                    "primary_output": primary["output"],
+                    "candidate_engine": self.engine,
+                    "candidate_latency_ms": latency_ms,
+                    "candidate_api_calls": api_calls[0],
+                    "candidate_output": output,
+                    "candidate_error": error,
+                }
+            )
+            with self.lock:
+                self.mirrored += 1
+            logging.info(
+                f"👥 [SHADOW] {self.engine}: {latency_ms:.0f}ms, {api_calls[0]} API calls "
+                f"(primary {primary['latency_ms']:.0f}ms, {primary['api_calls']} API calls)"
+            )
+        except Exception as e:
+            logging.error(f"❌ [SHADOW] Failed to store shadow result: {str(e)}", exc_info=True)
+        finally:
+            # Held until the result is stored so queued store writes also count against the budget
+            self.slots.release()
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "engine": self.engine,
+                "fraction": self.fraction,
+                "mirrored": self.mirrored,
+                "skipped_budget": self.skipped,
+                "errors": self.errors,
+            }
+
+
+def init_shadow(app):
+    """
+    Attach a ShadowMirror to the app when SHADOW_ENGINE is configured.
+    """
+    engine = app.config["SHADOW_ENGINE"]
+    if not engine or app.config["SHADOW_FRACTION"] <= 0:
+        return None
+    mirror = ShadowMirror(
+        engine,
+        app.config["SHADOW_FRACTION"],
+        ShadowStore(app.config["SHADOW_DB"]),
+        max_in_flight=app.config["SHADOW_MAX_IN_FLIGHT"],
+        timeout=app.config["SHADOW_TIMEOUT_MS"] / 1000,
+    )
+    app.extensions["shadow"] = mirror
+    logging.info(
+        f"👥 [SHADOW] Mirroring {app.config['SHADOW_FRACTION']:.0%} of messages to '{engine}' "
+        f"(max {app.config['SHADOW_MAX_IN_FLIGHT']} in flight, results in {app.config['SHADOW_DB']})"
+    )
+    return mirror
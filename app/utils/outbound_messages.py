@@ -0,0 +1,173 @@
+import json
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+
+# Outbound WhatsApp payloads as ready-to-send bytes.
+#
+# Every payload is assembled from pre-serialized pieces: the envelope up to and
+# including the recipient is cached per recipient, the constant part of each
+# payload shape (template name/language, button set, media kind, ...) is cached
+# per shape, and only the truly variable fields (text, captions, parameters)
+# are JSON-encoded per call. The output is byte-for-byte valid JSON with the
+# same escaping rules as json.dumps (ASCII-only).
+
+_ENVELOPE = b'{"messaging_product":"whatsapp","recipient_type":"individual","to":'
+_COMPACT = (",", ":")
+
+
+def _encode(value):
+    return encode_basestring_ascii(str(value)).encode("ascii")
+
+
+@lru_cache(maxsize=8192)
+def _recipient_head(to):
+    return _ENVELOPE + _encode(to)
+
+
+# --------------------------------------------------------------
+# Text
+# --------------------------------------------------------------
+
+_TEXT_HEAD = b',"type":"text","text":{"preview_url":false,"body":'
+_TEXT_HEAD_PREVIEW = b',"type":"text","text":{"preview_url":true,"body":'
+
+
+def text_message(to, body, preview_url=False):
+    return b"".join(
+        (_recipient_head(to), _TEXT_HEAD_PREVIEW if preview_url else _TEXT_HEAD, _encode(body), b"}}")
+    )
+
+
+# --------------------------------------------------------------
+# Template
+# --------------------------------------------------------------
+
+
+@lru_cache(maxsize=1024)
+def _template_head(name, language_code):
+    return b',"type":"template","template":{"name":%s,"language":{"code":%s}' % (
+        _encode(name),
+        _encode(language_code),
+    )
+
+
+def template_message(to, name, language_code="en_US", body_params=None, components=None):
+    """
+    Template message. `body_params` is a list of strings for the body's text
+    placeholders ({{1}}, {{2}}, ...); anything more elaborate (header media,
+    buttons) can be passed as raw Graph API `components` instead.
+    """
+    parts = [_recipient_head(to), _template_head(name, language_code)]
+    if body_params:
+        parts.append(b',"components":[{"type":"body","parameters":[')
+        parts.append(b",".join(b'{"type":"text","text":%s}' % _encode(p) for p in body_params))
+        parts.append(b"]}]")
+    elif components:
+        parts.append(b',"components":' + json.dumps(components, separators=_COMPACT).encode("ascii"))
+    parts.append(b"}}")
+    return b"".join(parts)
+
+
+# --------------------------------------------------------------
+# Interactive
+# --------------------------------------------------------------
+
+
+@lru_cache(maxsize=1024)
+def _buttons_action(buttons):
+    return b',"action":{"buttons":[%s]}}}' % b",".join(
+        b'{"type":"reply","reply":{"id":%s,"title":%s}}' % (_encode(button_id), _encode(title))
+        for button_id, title in buttons
+    )
+
+
+def button_message(to, body, buttons):
+    """
+    Interactive reply-button message. `buttons` is a sequence of (id, title)
+    pairs (WhatsApp allows up to three).
+    """
+    return b"".join(
+        (
+            _recipient_head(to),
+            b',"type":"interactive","interactive":{"type":"button","body":{"text":',
+            _encode(body),
+            b"}",
+            _buttons_action(tuple(tuple(button) for button in buttons)),
+        )
+    )
+
+
+@lru_cache(maxsize=1024)
+def _list_action(button, sections):
+    return b',"action":{"button":%s,"sections":[%s]}}}' % (
+        _encode(button),
+        b",".join(
+            b'{"title":%s,"rows":[%s]}'
+            % (
+                _encode(title),
+                b",".join(
+                    b'{"id":%s,"title":%s,"description":%s}' % (_encode(i), _encode(t), _encode(d))
+                    for i, t, d in rows
+                ),
+            )
+            for title, rows in sections
+        ),
+    )
+
+
+def list_message(to, body, button, sections):
+    """
+    Interactive list message. `sections` is a sequence of
+    (title, [(row_id, row_title, row_description), ...]).
+    """
+    sections = tuple((title, tuple(tuple(row) for row in rows)) for title, rows in sections)
+    return b"".join(
+        (
+            _recipient_head(to),
+            b',"type":"interactive","interactive":{"type":"list","body":{"text":',
+            _encode(body),
+            b"}",
+            _list_action(button, sections),
+        )
+    )
+
+
+# --------------------------------------------------------------
+# Media
+# --------------------------------------------------------------
+
+MEDIA_TYPES = ("image", "audio", "video", "document", "sticker")
+
+
+@lru_cache(maxsize=16)
+def _media_head(kind, by_id):
+    if kind not in MEDIA_TYPES:
+        raise ValueError(f"Unsupported media type '{kind}', expected one of {', '.join(MEDIA_TYPES)}")
+    return b',"type":"%s","%s":{"%s":' % (kind.encode(), kind.encode(), b"id" if by_id else b"link")
+
+
+def media_message(to, kind, link=None, media_id=None, caption=None, filename=None):
+    """
+    Image/audio/video/document/sticker message, by public `link` or uploaded
+    `media_id`. Captions apply to image, video and document.
+    """
+    if (link is None) == (media_id is None):
+        raise ValueError("Pass exactly one of link or media_id")
+    parts = [_recipient_head(to), _media_head(kind, media_id is not None), _encode(media_id or link)]
+    if caption:
+        parts.append(b',"caption":' + _encode(caption))
+    if filename:
+        parts.append(b',"filename":' + _encode(filename))
+    parts.append(b"}}")
+    return b"".join(parts)
+
+
+# --------------------------------------------------------------
+# Mark as read
+# --------------------------------------------------------------
+
+_READ_HEAD = b'{"messaging_product":"whatsapp","status":"read","message_id":'
+
+
+def mark_as_read(message_id):
+    return _READ_HEAD + _encode(message_id) + b"}"
@@ -0,0 +1,326 @@
+import contextvars
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g, request
+
+# The active trace and span for the current request. Both stay `None` when
+# tracing is disabled, which is what keeps `span`/`traced` almost free.
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+# (sampler, samples) of the request being profiled; copied contexts carry it into pool threads
+_current_samples = contextvars.ContextVar("current_samples", default=None)
+# Client-supplied X-Request-ID ends up in file names, logs and headers, so only safe IDs are kept
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class Trace:
+    __slots__ = ("trace_id", "started", "spans", "next_span")
+
+    def __init__(self, trace_id):
+        self.trace_id = trace_id
+        self.started = time.perf_counter()
+        self.spans = []
+        self.next_span = 0
+
+
+# --------------------------------------------------------------
+# Log correlation
+# --------------------------------------------------------------
+
+_default_record_factory = logging.getLogRecordFactory()
+
+
+def _record_factory(*args, **kwargs):
+    record = _default_record_factory(*args, **kwargs)
+    trace = _current_trace.get()
+    record.trace_id = trace.trace_id if trace is not None else "-"
+    record.span_id = _current_span.get() or "-"
+    return record
+
+
+# Installed at import time so every handler can use %(trace_id)s / %(span_id)s
+logging.setLogRecordFactory(_record_factory)
+
+
+def current_trace_id():
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+# --------------------------------------------------------------
+# Spans
+# --------------------------------------------------------------
+
+
+@contextmanager
+def span(name):
+    """
+    Time a block of code as a named span of the current request's trace.
+    Does nothing outside a traced request.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    trace.next_span += 1
+    span_id = f"{trace.trace_id}.{trace.next_span}"
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        trace.spans.append(
+            {
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start_ms": round((started - trace.started) * 1000, 3),
+                "duration_ms": round(elapsed_ms, 3),
+            }
+        )
+        logging.debug(f"⏱️ [TRACE] {name} took {elapsed_ms:.1f}ms")
+
+
+def traced(name):
+    """
+    Decorator form of `span`. The only cost when tracing is off is one context
+    variable lookup per call.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if _current_trace.get() is None:
+                return f(*args, **kwargs)
+            with span(name):
+                return f(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# --------------------------------------------------------------
+# Slow-request profiler
+# --------------------------------------------------------------
+
+
+class StackSampler:
+    """
+    Background thread that periodically samples the stacks of threads that are
+    currently serving a request. Samples are kept in memory per request and
+    only written out when the request turns out to be slow.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id):
+        samples = Counter()
+        with self.lock:
+            self.active[thread_id] = samples
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return samples
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.active.pop(thread_id, Counter())
+
+    def attach(self, thread_id, samples):
+        # A worker thread doing part of a request's work adds to that request's samples
+        with self.lock:
+            self.active[thread_id] = samples
+        self.wakeup.set()
+
+    def detach(self, thread_id, samples):
+        with self.lock:
+            if self.active.get(thread_id) is samples:
+                del self.active[thread_id]
+
+
+    def _run(self):
+        while True:
+            with self.lock:
+                idle = not self.active
+            if idle:
+                # Sleep until a request starts instead of polling forever
+                self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, samples in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse_stack(frame)] += 1
+            time.sleep(self.interval)
+
+
+@contextmanager
+def sampled_thread():
+    """
+    Include the current thread in the slow-request stack samples of the
+    request whose context it runs in (see response_service._submit). Does
+    nothing outside a sampled request. cProfile mode only ever covers the
+    request thread itself.
+    """
+    current = _current_samples.get()
+    if current is None:
+        yield
+        return
+    sampler, samples = current
+    thread_id = threading.get_ident()
+    sampler.attach(thread_id, samples)
+    try:
+        yield
+    finally:
+        sampler.detach(thread_id, samples)
+
+
+def _collapse_stack(frame):
+    # Brendan Gregg's "collapsed" format: root;caller;callee
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _rotate(directory, keep):
+    # Every slow request writes a .json summary plus one profile file
+    names = sorted(n for n in os.listdir(directory) if n.endswith(".json"))
+    for name in names[: max(0, len(names) - keep)]:
+        prefix = name[: -len(".json")]
+        for suffix in (".json", ".collapsed", ".prof"):
+            try:
+                os.remove(os.path.join(directory, prefix + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def _write_profile(config, trace, duration_ms, samples, profile):
+    directory = config["PROFILE_DIR"]
+    os.makedirs(directory, exist_ok=True)
+    prefix = os.path.join(directory, f"{time.strftime('%Y%m%dT%H%M%S')}-{trace.trace_id}")
+
+    if profile is not None:
+        profile.dump_stats(prefix + ".prof")
+    elif samples:
+        with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+    with open(prefix + ".json", "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "trace_id": trace.trace_id,
+                "method": request.method,
+                "path": request.path,
+                "duration_ms": round(duration_ms, 3),
+                "spans": trace.spans,
+            },
+            f,
+            indent=2,
+        )
+    _rotate(directory, config["PROFILE_KEEP"])
+    logging.warning(f"🐌 [PROFILER] Slow request ({duration_ms:.0f}ms) profile written to {prefix}.*")
+
+
+# --------------------------------------------------------------
+# Flask integration
+# --------------------------------------------------------------
+
+
+def init_tracing(app):
+    """
+    Register request hooks that start a trace per request and, if configured,
+    profile requests slower than PROFILE_SLOW_MS.
+    """
+    tracing_enabled = app.config["TRACE_ENABLED"]
+    slow_ms = app.config["PROFILE_SLOW_MS"]
+    # Only profile when the slow-request profiler is on; tracing alone must stay cheap
+    use_cprofile = bool(slow_ms) and app.config["PROFILE_MODE"] == "cprofile"
+    sampler = None
+    if slow_ms and not use_cprofile:
+        sampler = StackSampler(app.config["PROFILE_INTERVAL_MS"] / 1000)
+
+    if not tracing_enabled and not slow_ms:
+        logging.info("⏱️ [TRACE] Tracing and slow-request profiling disabled")
+        return
+
+    profiler = f">= {slow_ms}ms ({app.config['PROFILE_MODE']})" if slow_ms else "disabled"
+    logging.info(
+        f"⏱️ [TRACE] Tracing {'enabled' if tracing_enabled else 'disabled'}; slow-request profiler {profiler}"
+    )
+
+    @app.before_request
+    def start_trace():
+        request_id = request.headers.get("X-Request-ID", "")
+        trace = Trace(request_id if _REQUEST_ID.match(request_id) else uuid.uuid4().hex[:16])
+        g.trace_token = _current_trace.set(trace)
+        g.trace_samples = None
+        g.trace_profile = None
+        if sampler is not None:
+            g.trace_samples = sampler.start(threading.get_ident())
+            g.trace_samples_token = _current_samples.set((sampler, g.trace_samples))
+        elif use_cprofile:
+            g.trace_profile = cProfile.Profile()
+            g.trace_profile.enable()
+
+    @app.after_request
+    def add_trace_header(response):
+        trace = _current_trace.get()
+        if trace is not None:
+            response.headers["X-Request-ID"] = trace.trace_id
+        return response
+
+    @app.teardown_request
+    def finish_trace(exc):
+        token = g.pop("trace_token", None)
+        if token is None:
+            return
+        trace = _current_trace.get()
+        duration_ms = (time.perf_counter() - trace.started) * 1000
+        profile = g.pop("trace_profile", None)
+        if profile is not None:
+            profile.disable()
+        samples = g.pop("trace_samples", None)
+        if sampler is not None:
+            sampler.stop(threading.get_ident())
+            samples_token = g.pop("trace_samples_token", None)
+            if samples_token is not None:
+                _current_samples.reset(samples_token)
+
+        try:
+            if tracing_enabled:
+                stages = ", ".join(f"{s['name']}={s['duration_ms']:.1f}ms" for s in trace.spans)
+                logging.info(f"⏱️ [TRACE] {request.method} {request.path} {duration_ms:.1f}ms [{stages}]")
+            if slow_ms and duration_ms >= slow_ms:
+                _write_profile(app.config, trace, duration_ms, samples, profile)
+        except Exception as e:
+            logging.error(f"❌ [TRACE] Failed to record trace: {str(e)}", exc_info=True)
+        finally:
+            _current_trace.reset(token)
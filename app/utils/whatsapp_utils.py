@@ -2,9 +2,21 @@ import logging
 from flask import current_app, jsonify
 import json
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.services.openai_governor import count_api_calls
+from app.services.response_service import generate_response_within_budget
+from app.services.settings_service import current_settings
+from app.utils.outbound_messages import text_message
+from app.utils.tracing import traced
 
 # from app.services.openai_service import generate_response
 import re
+import time
+
+# Shared keep-alive connection pool to graph.facebook.com for all outbound sends
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
 
 
 def log_http_response(response):
@@ -30,30 +42,37 @@ def get_text_message_input(recipient, text):
     )
 
 
+@traced("generate_response")
 def generate_response(response):
     # Return text in uppercase
     return response.upper()
 
 
+@traced("send_message")
 def send_message(data):
+    """
+    POST a message payload (JSON str or pre-serialized bytes from
+    app.utils.outbound_messages) to the WhatsApp Cloud API.
+    """
     logging.info("=" * 80)
     logging.info("📤 [SEND MESSAGE] Preparing to send message to WhatsApp API")
     
+    settings = current_settings()
     headers = {
         "Content-type": "application/json",
-        "Authorization": f"Bearer {current_app.config['ACCESS_TOKEN']}",
+        "Authorization": f"Bearer {settings['ACCESS_TOKEN']}",
     }
     
     logging.debug(f"Headers: {{'Content-type': 'application/json', 'Authorization': 'Bearer ***hidden***'}}")
 
-    url = f"https://graph.facebook.com/{current_app.config['VERSION']}/{current_app.config['PHONE_NUMBER_ID']}/messages"
+    url = f"https://graph.facebook.com/{settings['VERSION']}/{settings['PHONE_NUMBER_ID']}/messages"
     logging.info(f"📍 API Endpoint: {url}")
     
     try:
-        logging.info(f"Message payload: {data}")
+        logging.info(f"Message payload: {data.decode('utf-8') if isinstance(data, bytes) else data}")
         logging.info("🔄 [SEND MESSAGE] Sending POST request to WhatsApp API...")
         
-        response = requests.post(
+        response = _session.post(
             url, data=data, headers=headers, timeout=10
         )  # 10 seconds timeout as an example
         
@@ -108,6 +127,7 @@ def process_text_for_whatsapp(text):
     return whatsapp_style_text
 
 
+@traced("process_whatsapp_message")
 def process_whatsapp_message(body):
     logging.info("=" * 80)
     logging.info("🔄 [PROCESS MESSAGE] Starting WhatsApp message processing...")
@@ -129,27 +149,65 @@ def process_whatsapp_message(body):
         logging.info(f"✅ Message timestamp: {message_timestamp}")
         logging.info(f"📝 Message content: '{message_body}'")
         
-        # Generate response
-        logging.info("🧠 [PROCESS MESSAGE] Generating response...")
-        response = generate_response(message_body)
-        logging.info(f"✅ Response generated: '{response}'")
+        # Send message to the sender (wa_id), not a hardcoded recipient
+        recipient = f"+{wa_id}"  # Format: +<country_code><phone_number>
+        logging.info(f"📍 Recipient: {recipient} (Replying to sender)")
 
-        # OpenAI Integration
-        # response = generate_response(message_body, wa_id, name)
-        # response = process_text_for_whatsapp(response)
+        # Generate response within the latency budget
+        # (RESPONSE_ENGINE=openai switches the primary generator to the OpenAI assistant)
+        logging.info("🧠 [PROCESS MESSAGE] Generating response...")
+        started = time.perf_counter()
+        with count_api_calls() as api_calls:
+            response, winner = generate_response_within_budget(
+                message_body,
+                wa_id,
+                name,
+                send_interim=lambda text: send_message(text_message(recipient, text)),
+            )
+        latency_ms = (time.perf_counter() - started) * 1000
+        if response is None:
+            logging.warning("⌛ [PROCESS MESSAGE] No response within the latency budget")
+            response = current_app.config["RESPONSE_TIMEOUT_TEXT"]
+        logging.info(f"✅ Response generated by '{winner}': '{response}'")
 
         # Prepare message payload
         logging.info("📦 [PROCESS MESSAGE] Preparing message payload...")
-        # Send message to the sender (wa_id), not a hardcoded recipient
-        recipient = f"+{wa_id}"  # Format: +<country_code><phone_number>
-        logging.info(f"📍 Recipient: {recipient} (Replying to sender)")
         
-        data = get_text_message_input(recipient, response)
-        logging.info(f"✅ Payload prepared: {data}")
+        data = text_message(recipient, response)
+        logging.info(f"✅ Payload prepared: {data.decode('utf-8')}")
         
         # Send the response message
         logging.info("📤 [PROCESS MESSAGE] Sending response message...")
         send_message(data)
+
+        # Mirror to the candidate engine in the background, if shadow mode is on
+        shadow = current_app.extensions.get("shadow")
+        if shadow is not None:
+            shadow.maybe_mirror(
+                message_id,
+                message_body,
+                wa_id,
+                name,
+                {
+                    "engine": current_app.config["RESPONSE_ENGINE"],
+                    "winner": winner,
+                    "latency_ms": latency_ms,
+                    "api_calls": api_calls[0],
+                    "output": response,
+                },
+                current_app.config,
+            )
+
+        # Every new message pushes the guest's "gone quiet" follow-up further out
+        scheduler = current_app.extensions.get("scheduler")
+        followup_minutes = current_app.config["SCHEDULER_FOLLOWUP_MINUTES"]
+        if scheduler is not None and followup_minutes > 0:
+            scheduler.store.schedule(
+                wa_id,
+                text_message(recipient, current_app.config["SCHEDULER_FOLLOWUP_TEXT"]),
+                time.time() + followup_minutes * 60,
+                key=f"followup:{wa_id}",
+            )
         
         logging.info("✅ [PROCESS MESSAGE] Message processing completed successfully!")
         logging.info("=" * 80)
@@ -1,17 +1,37 @@
 import logging
 import json
+import hmac
+import math
+import time
+from functools import wraps
 
 from flask import Blueprint, request, jsonify, current_app
 
 from .decorators.security import signature_required
+from .services.forwarding_service import is_status_event
+from .services.openai_governor import governor
+from .services.response_service import stats as response_stats
+from .services.settings_service import current_settings
+from .utils.outbound_messages import template_message, text_message
+from .utils.tracing import traced
 from .utils.whatsapp_utils import (
     process_whatsapp_message,
     is_valid_whatsapp_message,
+    send_message,
 )
 
 webhook_blueprint = Blueprint("webhook", __name__)
+admin_blueprint = Blueprint("admin", __name__)
 
 
+def journal_request():
+    # Journal the raw verified body before anything else can fail
+    journal = current_app.extensions.get("webhook_journal")
+    if journal is not None:
+        journal.append(request.get_data())
+
+
+@traced("handle_message")
 def handle_message():
     """
     Handle incoming webhook events from the WhatsApp API.
@@ -29,6 +49,8 @@ def handle_message():
     logging.info("=" * 80)
     logging.info("🔵 [WEBHOOK POST] New webhook request received")
     logging.info(f"Headers: {dict(request.headers)}")
+
+    journal_request()
     
     try:
         body = request.get_json()
@@ -76,6 +98,47 @@ def handle_message():
         logging.info("=" * 80)
 
 
+@traced("forward_message")
+def forward_message(forwarder):
+    """
+    Forward a verified webhook event to the downstream bots instead of
+    processing it locally.
+
+    Status events are queued for micro-batching and acknowledged right away.
+    Message events are fanned out to every bot; any `{"messages": [...]}`
+    payloads in their responses are sent through our outbound sender. If no
+    bot accepted the event, 502 is returned so Meta retries it.
+    """
+    logging.info("=" * 80)
+    logging.info("↪️ [FORWARD] Forwarding webhook event to downstream bots")
+    journal_request()
+
+    try:
+        raw_body = request.get_data()
+        body = json.loads(raw_body)
+    except ValueError as e:
+        logging.error(f"❌ [FORWARD] Failed to parse JSON body: {str(e)}")
+        return jsonify({"status": "error", "message": "Invalid JSON provided"}), 400
+
+    try:
+        if is_status_event(body):
+            forwarder.enqueue_status(body)
+            logging.info("📊 [FORWARD] Status event queued for batched forwarding")
+            return jsonify({"status": "ok"}), 200
+
+        delivered, replies = forwarder.forward_message(raw_body, body)
+        if not delivered:
+            logging.error("❌ [FORWARD] No downstream bot accepted the event")
+            return jsonify({"status": "error", "message": "Downstream bots unavailable"}), 502
+
+        for reply in replies or []:
+            logging.info("📤 [FORWARD] Sending downstream reply through outbound sender")
+            send_message(json.dumps(reply))
+        return jsonify({"status": "ok"}), 200
+    finally:
+        logging.info("=" * 80)
+
+
 # Required webhook verifictaion for WhatsApp
 def verify():
     logging.info("=" * 80)
@@ -94,7 +157,7 @@ def verify():
     # Check if a token and mode were sent
     if mode and token:
         # Check the mode and token sent are correct
-        if mode == "subscribe" and token == current_app.config["VERIFY_TOKEN"]:
+        if mode == "subscribe" and token == current_settings()["VERIFY_TOKEN"]:
             # Respond with 200 OK and challenge token from the request
             logging.info("✅ [WEBHOOK VERIFY] WEBHOOK_VERIFIED - Token matches!")
             logging.info(f"Returning challenge: {challenge}")
@@ -125,7 +188,150 @@ def webhook_get():
 @webhook_blueprint.route("/webhook", methods=["POST"])
 @signature_required
 def webhook_post():
+    forwarder = current_app.extensions.get("forwarder")
+    if forwarder is not None:
+        logging.info("🟡 [ROUTE] POST /webhook request routed to forward_message() after signature verification")
+        return forward_message(forwarder)
     logging.info("🟡 [ROUTE] POST /webhook request routed to handle_message() after signature verification")
     return handle_message()
 
 
+@webhook_blueprint.route("/outbound", methods=["POST"])
+def outbound_post():
+    """
+    Lets downstream bots send asynchronous replies through our outbound sender.
+    Expects `Authorization: Bearer <FORWARD_REPLY_TOKEN>` and a WhatsApp
+    message payload (or a list of them) as the body.
+    """
+    token = current_app.config["FORWARD_REPLY_TOKEN"]
+    if not token or "forwarder" not in current_app.extensions:
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    provided = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(provided, f"Bearer {token}"):
+        logging.warning("❌ [OUTBOUND] Invalid reply token")
+        return jsonify({"status": "error", "message": "Unauthorized"}), 401
+
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({"status": "error", "message": "Invalid JSON provided"}), 400
+    messages = payload if isinstance(payload, list) else [payload]
+    logging.info(f"📤 [OUTBOUND] Sending {len(messages)} downstream replies")
+    for message in messages:
+        send_message(json.dumps(message))
+    return jsonify({"status": "ok", "sent": len(messages)}), 200
+
+
+def admin_token_required(f):
+    """
+    Admin endpoints are disabled unless ADMIN_TOKEN is set, and then require
+    `Authorization: Bearer <ADMIN_TOKEN>`.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        token = current_app.config["ADMIN_TOKEN"]
+        if not token:
+            return jsonify({"status": "error", "message": "Not found"}), 404
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            logging.warning("❌ [ADMIN] Invalid admin token")
+            return jsonify({"status": "error", "message": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+
+    return decorated_function
+
+
+@admin_blueprint.route("/admin/stats", methods=["GET"])
+@admin_token_required
+def admin_stats():
+    forwarder = current_app.extensions.get("forwarder")
+    shadow = current_app.extensions.get("shadow")
+    scheduler = current_app.extensions.get("scheduler")
+    return jsonify(
+        {
+            "openai_governor": governor.snapshot(),
+            "response_paths": response_stats.snapshot(),
+            "forwarding": forwarder.snapshot() if forwarder is not None else None,
+            "shadow": shadow.snapshot() if shadow is not None else None,
+            "scheduler": scheduler.snapshot() if scheduler is not None else None,
+        }
+    ), 200
+
+
+@admin_blueprint.route("/admin/schedule", methods=["POST"])
+@admin_token_required
+def admin_schedule():
+    """
+    Schedule a text or template message:
+    {"to": "+31...", "text": "..." | "template": {"name", "language", "params"},
+     "send_at": <epoch seconds> | "delay_minutes": <n>, "key": optional}
+
+    Scheduling again with the same key replaces the pending message.
+    """
+    scheduler = current_app.extensions.get("scheduler")
+    if scheduler is None:
+        return jsonify({"status": "error", "message": "Scheduler disabled, set SCHEDULER_DB"}), 404
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({"status": "error", "message": "Invalid JSON provided"}), 400
+    to = body.get("to")
+    if not isinstance(to, str) or not to or ("text" not in body and "template" not in body):
+        return jsonify({"status": "error", "message": "'to' and 'text' or 'template' are required"}), 400
+    if "text" in body:
+        if not isinstance(body["text"], str) or not body["text"]:
+            return jsonify({"status": "error", "message": "'text' must be a non-empty string"}), 400
+        payload = text_message(to, body["text"])
+    else:
+        template = body["template"]
+        if (
+            not isinstance(template, dict)
+            or not isinstance(template.get("name"), str)
+            or not isinstance(template.get("language", "en_US"), str)
+            or not isinstance(template.get("params") or [], list)
+            or not all(isinstance(param, str) for param in template.get("params") or [])
+        ):
+            return jsonify(
+                {"status": "error", "message": "'template' needs a 'name', optional 'language' and a list of string 'params'"}
+            ), 400
+        payload = template_message(to, template["name"], template.get("language", "en_US"), template.get("params"))
+    try:
+        if "send_at" in body:
+            due_at = float(body["send_at"])
+        else:
+            due_at = time.time() + float(body.get("delay_minutes", 0)) * 60
+    except (TypeError, ValueError):
+        return jsonify({"status": "error", "message": "'send_at' and 'delay_minutes' must be numbers"}), 400
+    if not math.isfinite(due_at):
+        return jsonify({"status": "error", "message": "'send_at' and 'delay_minutes' must be finite"}), 400
+    key = body.get("key")
+    if key is not None and not isinstance(key, str):
+        return jsonify({"status": "error", "message": "'key' must be a string"}), 400
+    message_id = scheduler.store.schedule(to.lstrip("+"), payload, due_at, key=key)
+    if due_at - time.time() < scheduler.poll_interval:
+        scheduler.notify()
+    return jsonify({"status": "ok", "id": message_id, "due_at": due_at}), 200
+
+
+@admin_blueprint.route("/admin/schedule/<int:message_id>", methods=["DELETE"])
+@admin_token_required
+def admin_cancel_schedule(message_id):
+    scheduler = current_app.extensions.get("scheduler")
+    if scheduler is None:
+        return jsonify({"status": "error", "message": "Scheduler disabled, set SCHEDULER_DB"}), 404
+    if not scheduler.store.cancel(message_id):
+        return jsonify({"status": "error", "message": "No pending message with that ID"}), 404
+    return jsonify({"status": "ok"}), 200
+
+
+@admin_blueprint.route("/admin/config", methods=["GET"])
+@admin_token_required
+def admin_config():
+    """Hot reload state of this worker; setting values are never returned."""
+    return jsonify(current_app.extensions["settings"].snapshot()), 200
+
+
+@admin_blueprint.route("/admin/config/reload", methods=["POST"])
+@admin_token_required
+def admin_config_reload():
+    # Reloads the worker serving this request; the others pick the change up from the file watch
+    status = current_app.extensions["settings"].reload("admin")
+    return jsonify(status), 200 if status["status"] == "ok" else 400
@@ -2,8 +2,14 @@ from openai import OpenAI
 import shelve
 from dotenv import load_dotenv
 import os
+import sys
 import time
 
+# Allow importing the app package when run from start/
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.knowledge_base_service import DATA_DIR, MANIFEST_PATH, sync_knowledge_base
+
 load_dotenv()
 OPEN_AI_API_KEY = os.getenv("OPEN_AI_API_KEY")
 client = OpenAI(api_key=OPEN_AI_API_KEY)
@@ -12,19 +18,17 @@ client = OpenAI(api_key=OPEN_AI_API_KEY)
 # --------------------------------------------------------------
 # Upload file
 # --------------------------------------------------------------
+# Kept for one-off uploads; the knowledge base sync below is what sets up the assistant
 def upload_file(path):
     # Upload a file with an "assistants" purpose
     file = client.files.create(file=open(path, "rb"), purpose="assistants")
     return file
 
 
-file = upload_file("../data/airbnb-faq.pdf")
-
-
 # --------------------------------------------------------------
 # Create assistant
 # --------------------------------------------------------------
-def create_assistant(file):
+def create_assistant(file_ids):
     """
     You currently cannot set the temperature for Assistant via the API.
     """
@@ -33,12 +37,13 @@ def create_assistant(file):
         instructions="You're a helpful WhatsApp assistant that can assist guests that are staying in our Paris AirBnb. Use your knowledge base to best respond to customer queries. If you don't know the answer, say simply that you cannot help with question and advice to contact the host directly. Be friendly and funny.",
         tools=[{"type": "retrieval"}],
         model="gpt-4-1106-preview",
-        file_ids=[file.id],
+        file_ids=file_ids,
     )
     return assistant
 
 
-assistant = create_assistant(file)
+# Only uploads new/changed files and reuses the assistant recorded in the manifest
+assistant_id = sync_knowledge_base(client, DATA_DIR, MANIFEST_PATH, create_assistant=create_assistant)
 
 
 # --------------------------------------------------------------
@@ -91,7 +96,7 @@ def generate_response(message_body, wa_id, name):
 # --------------------------------------------------------------
 def run_assistant(thread):
     # Retrieve the Assistant
-    assistant = client.beta.assistants.retrieve("asst_7Wx2nQwoPWSf710jrdWTDlfE")
+    assistant = client.beta.assistants.retrieve(assistant_id)
 
     # Run the assistant
     run = client.beta.threads.runs.create(
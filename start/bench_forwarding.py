@@ -0,0 +1,152 @@
+import argparse
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+# Allow `python start/bench_forwarding.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+# --------------------------------------------------------------
+# Forwarding overhead benchmark
+# --------------------------------------------------------------
+#
+# Starts a local stub bot, then compares posting webhook events straight to
+# it with posting them through the app in forwarding mode (signature check,
+# dedup, fan-out over pooled connections). No Meta or OpenAI access needed.
+#
+#   python start/bench_forwarding.py --requests 2000
+
+
+class StubBot(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Avoid Nagle/delayed-ACK stalls that would dwarf what we are measuring
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+    received = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with StubBot.lock:
+            StubBot.received += 1
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def message_event(i):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [
+            {
+                "changes": [
+                    {
+                        "value": {
+                            "contacts": [{"wa_id": "15550000000", "profile": {"name": "Bench"}}],
+                            "messages": [{"id": f"wamid.bench{i}", "text": {"body": "hello"}}],
+                        }
+                    }
+                ]
+            }
+        ],
+    }
+
+
+def status_event(i):
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {"statuses": [{"id": f"wamid.bench{i}", "status": "delivered"}]}}]}],
+    }
+
+
+def summarize(label, latencies):
+    values = sorted(latencies)
+    p = lambda q: values[min(len(values) - 1, int(len(values) * q))]
+    print(
+        f"{label:<22} n={len(values):<6} mean={sum(values) / len(values):7.3f}ms "
+        f"p50={p(0.5):7.3f}ms p99={p(0.99):7.3f}ms"
+    )
+    return sum(values) / len(values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure forwarding overhead against a local stub bot")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--targets", type=int, default=1, help="Number of stub bot URLs to fan out to")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubBot)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stub_url = f"http://127.0.0.1:{server.server_port}/webhook"
+
+    secret = "bench-secret"
+    os.environ.update(
+        APP_SECRET=secret,
+        FORWARD_URLS=",".join(f"{stub_url}?target={i}" for i in range(args.targets)),
+        LOG_LEVEL=os.getenv("LOG_LEVEL", "WARNING"),
+    )
+    from app import create_app
+
+    logging.getLogger().setLevel(os.environ["LOG_LEVEL"])
+    app = create_app()
+    logging.getLogger().setLevel(os.environ["LOG_LEVEL"])
+    client = app.test_client()
+
+    def sign(body):
+        return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    bodies = [json.dumps(message_event(i)).encode() for i in range(args.requests)]
+
+    # Baseline: Meta -> bot directly, one pooled connection
+    session = requests.Session()
+    direct = []
+    for body in bodies:
+        started = time.perf_counter()
+        session.post(stub_url, data=body, headers={"Content-Type": "application/json"}, timeout=5)
+        direct.append((time.perf_counter() - started) * 1000)
+
+    # Through the proxy (in-process WSGI call, so no extra client->proxy hop is counted)
+    proxied = []
+    for body in bodies:
+        started = time.perf_counter()
+        client.post("/webhook", data=body, headers={"X-Hub-Signature-256": sign(body), "Content-Type": "application/json"})
+        proxied.append((time.perf_counter() - started) * 1000)
+
+    print(f"Message events, {args.targets} target(s):")
+    direct_mean = summarize("direct to stub", direct)
+    proxied_mean = summarize("through proxy", proxied)
+    print(f"{'overhead':<22} {proxied_mean - direct_mean:.3f}ms per event (mean)")
+
+    # Status events: acknowledged immediately and merged into batches
+    StubBot.received = 0
+    statuses = [json.dumps(status_event(i)).encode() for i in range(args.requests)]
+    started = time.perf_counter()
+    for body in statuses:
+        client.post("/webhook", data=body, headers={"X-Hub-Signature-256": sign(body), "Content-Type": "application/json"})
+    ack_ms = (time.perf_counter() - started) * 1000 / len(statuses)
+    time.sleep(app.config["FORWARD_BATCH_MS"] / 1000 * 3)
+    print(
+        f"Status events: {len(statuses)} acknowledged at {ack_ms:.3f}ms each, "
+        f"delivered in {StubBot.received} downstream requests"
+    )
+    print(json.dumps(app.extensions["forwarder"].snapshot(), indent=2))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
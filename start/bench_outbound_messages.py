@@ -0,0 +1,91 @@
+import json
+import os
+import sys
+import timeit
+
+# Allow `python start/bench_outbound_messages.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.utils.outbound_messages import button_message, template_message, text_message
+from app.utils.whatsapp_utils import get_text_message_input
+
+# --------------------------------------------------------------
+# Outbound payload serialization benchmark
+# --------------------------------------------------------------
+#
+# Compares building a fresh dict + json.dumps per message (the original
+# get_text_message_input approach) with the pre-serialized builders.
+#
+#   python start/bench_outbound_messages.py
+
+N = 200000
+RECIPIENT = "+31612345678"
+TEXT = "Check-in is from 3pm. The lockbox code will be sent on the morning of your arrival."
+
+
+def dict_template(recipient, name, params):
+    return json.dumps(
+        {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": recipient,
+            "type": "template",
+            "template": {
+                "name": name,
+                "language": {"code": "en_US"},
+                "components": [{"type": "body", "parameters": [{"type": "text", "text": p} for p in params]}],
+            },
+        }
+    ).encode("utf-8")
+
+
+def dict_buttons(recipient, body, buttons):
+    return json.dumps(
+        {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": recipient,
+            "type": "interactive",
+            "interactive": {
+                "type": "button",
+                "body": {"text": body},
+                "action": {"buttons": [{"type": "reply", "reply": {"id": i, "title": t}} for i, t in buttons]},
+            },
+        }
+    ).encode("utf-8")
+
+
+BUTTONS = [("yes", "Yes"), ("no", "No"), ("host", "Talk to host")]
+# Broadcast-style: a different recipient for every message
+RECIPIENTS = [f"+3161{i:07d}" for i in range(N)]
+
+CASES = [
+    (
+        "text reply",
+        lambda: get_text_message_input(RECIPIENT, TEXT).encode("utf-8"),
+        lambda: text_message(RECIPIENT, TEXT),
+    ),
+    (
+        "template broadcast",
+        lambda it=iter(RECIPIENTS * 2): dict_template(next(it), "checkin_reminder", ["Anna", "3pm"]),
+        lambda it=iter(RECIPIENTS * 2): template_message(next(it), "checkin_reminder", "en_US", ["Anna", "3pm"]),
+    ),
+    (
+        "interactive buttons",
+        lambda: dict_buttons(RECIPIENT, TEXT, BUTTONS),
+        lambda: button_message(RECIPIENT, TEXT, BUTTONS),
+    ),
+]
+
+
+def main():
+    print(f"{'payload':<22}{'json.dumps':>14}{'pre-serialized':>18}{'speedup':>10}")
+    for label, baseline, builder in CASES:
+        assert json.loads(baseline()) == json.loads(builder())
+        base_us = min(timeit.repeat(baseline, number=N // 4, repeat=3)) / (N // 4) * 1e6
+        built_us = min(timeit.repeat(builder, number=N // 4, repeat=3)) / (N // 4) * 1e6
+        print(f"{label:<22}{base_us:>11.2f} us{built_us:>15.2f} us{base_us / built_us:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
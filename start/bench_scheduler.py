@@ -0,0 +1,93 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Allow `python start/bench_scheduler.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.scheduler_service import MessageScheduler, SchedulerStore
+from app.utils.outbound_messages import text_message
+
+# --------------------------------------------------------------
+# Scheduled message engine benchmark
+# --------------------------------------------------------------
+#
+# Fills a fresh store with a backlog of pending messages spread over the next
+# 30 days, then measures single inserts, keyed reschedules and cancels against
+# that backlog, and finally fires due messages in batches with a no-op sender.
+#
+#   python start/bench_scheduler.py --messages 1000000 --fire 100000
+
+
+def rate(count, seconds):
+    return f"{count / seconds:>12,.0f}/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scheduled message store")
+    parser.add_argument("--messages", type=int, default=1000000, help="Pending backlog size")
+    parser.add_argument("--ops", type=int, default=10000, help="Single schedule/cancel operations to time")
+    parser.add_argument("--fire", type=int, default=100000, help="Messages to fire")
+    parser.add_argument("--batch", type=int, default=500, help="Firing batch size")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench_scheduler_")
+    store = SchedulerStore(os.path.join(directory, "scheduled.db"))
+    payload = text_message("+31612345678", "Your check-in instructions: the lockbox code is 4821.")
+    now = time.time()
+    horizon = 30 * 86400
+
+    started = time.perf_counter()
+    for offset in range(0, args.messages, 10000):
+        count = min(10000, args.messages - offset)
+        store.schedule_many(
+            (f"3161{offset + i:07d}", payload, now + random.random() * horizon) for i in range(count)
+        )
+    elapsed = time.perf_counter() - started
+    print(f"{'bulk schedule':<28}{args.messages:>10,}{rate(args.messages, elapsed)}")
+
+    started = time.perf_counter()
+    ids = [store.schedule("31600000000", payload, now + random.random() * horizon) for _ in range(args.ops)]
+    elapsed = time.perf_counter() - started
+    print(f"{'schedule (one per commit)':<28}{args.ops:>10,}{rate(args.ops, elapsed)}")
+
+    started = time.perf_counter()
+    for i in range(args.ops):
+        store.schedule("31600000000", payload, now + random.random() * horizon, key=f"followup:{i % 1000}")
+    elapsed = time.perf_counter() - started
+    print(f"{'keyed reschedule':<28}{args.ops:>10,}{rate(args.ops, elapsed)}")
+
+    random.shuffle(ids)
+    started = time.perf_counter()
+    for message_id in ids:
+        store.cancel(message_id)
+    elapsed = time.perf_counter() - started
+    print(f"{'cancel by id':<28}{args.ops:>10,}{rate(args.ops, elapsed)}")
+
+    started = time.perf_counter()
+    for _ in range(args.ops):
+        store.next_due()
+    elapsed = time.perf_counter() - started
+    print(f"{'next due lookup':<28}{args.ops:>10,}{rate(args.ops, elapsed)}")
+
+    # Fire the earliest messages as if the clock had moved forward
+    scheduler = MessageScheduler(store, lambda payload: 200, os.path.join(directory, "lock"), batch_size=args.batch)
+    fire_until = now + horizon
+    fired = 0
+    started = time.perf_counter()
+    while fired < args.fire:
+        claimed = scheduler.fire_due(now=fire_until)
+        if not claimed:
+            break
+        fired += claimed
+    elapsed = time.perf_counter() - started
+    print(f"{'fire (batch ' + str(args.batch) + ')':<28}{fired:>10,}{rate(fired, elapsed)}")
+    print(f"\nstore: {store.counts()}")
+    print(f"database: {os.path.getsize(store.path) / 1e6:.0f} MB in {directory}")
+
+
+if __name__ == "__main__":
+    main()
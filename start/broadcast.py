@@ -0,0 +1,78 @@
+import argparse
+import json
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Allow `python start/broadcast.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.broadcast_service import load_recipients, run_broadcast
+
+# --------------------------------------------------------------
+# Load environment variables
+# --------------------------------------------------------------
+
+load_dotenv()
+ACCESS_TOKEN = os.getenv("ACCESS_TOKEN")
+PHONE_NUMBER_ID = os.getenv("PHONE_NUMBER_ID")
+VERSION = os.getenv("VERSION")
+
+# --------------------------------------------------------------
+# Bulk template broadcast
+# --------------------------------------------------------------
+#
+# Example:
+#   python start/broadcast.py guests.csv --template checkin_reminder \
+#       --language en_US --rate 40 --concurrency 32 --output results.csv
+#
+# Re-running the same command after a crash resumes from the checkpoint
+# (`<output>.checkpoint` by default) and never resends to a recipient.
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Send a WhatsApp template to a list of recipients")
+    parser.add_argument("recipients", help="Text/CSV file with one WhatsApp ID per line (first column)")
+    parser.add_argument("--template", required=True, help="Approved template name")
+    parser.add_argument("--language", default="en_US", help="Template language code")
+    parser.add_argument("--components", help="JSON file with template components (header/body parameters)")
+    parser.add_argument("--rate", type=float, default=20.0, help="Maximum messages per second")
+    parser.add_argument("--concurrency", type=int, default=16, help="Number of concurrent senders")
+    parser.add_argument("--output", default="broadcast_results.csv", help="Per-recipient results (CSV)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output>.checkpoint)")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=sys.stdout,
+    )
+
+    if not (ACCESS_TOKEN and PHONE_NUMBER_ID and VERSION):
+        parser.error("ACCESS_TOKEN, PHONE_NUMBER_ID and VERSION must be set in the environment")
+
+    components = None
+    if args.components:
+        with open(args.components, "r", encoding="utf-8") as f:
+            components = json.load(f)
+
+    stats = run_broadcast(
+        load_recipients(args.recipients),
+        args.template,
+        args.language,
+        access_token=ACCESS_TOKEN,
+        version=VERSION,
+        phone_number_id=PHONE_NUMBER_ID,
+        checkpoint_path=args.checkpoint or f"{args.output}.checkpoint",
+        results_path=args.output,
+        rate=args.rate,
+        concurrency=args.concurrency,
+        components=components,
+    )
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
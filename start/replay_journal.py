@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import hmac
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+from dotenv import load_dotenv
+
+# Allow `python start/replay_journal.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.journal_service import iter_journal
+
+# --------------------------------------------------------------
+# Load environment variables
+# --------------------------------------------------------------
+
+load_dotenv()
+APP_SECRET = os.getenv("APP_SECRET")
+
+# --------------------------------------------------------------
+# Replay journaled webhooks
+# --------------------------------------------------------------
+#
+# Bodies are re-signed with APP_SECRET so they pass signature_required.
+#
+# Through the in-process pipeline (WARNING: replies are really sent unless the
+# env points at a test number):
+#   python start/replay_journal.py journal/ --mode pipeline
+#
+# As a load test against a running server, 10x faster than recorded:
+#   python start/replay_journal.py journal/ --mode http \
+#       --url http://localhost:8000/webhook --speed 10 --concurrency 32
+#
+# --speed 0 replays as fast as possible.
+
+
+def parse_time(value):
+    if value is None:
+        return None
+    try:
+        return int(float(value) * 1e9)
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp() * 1e9)
+
+
+def sign(body):
+    return "sha256=" + hmac.new(bytes(APP_SECRET, "latin-1"), msg=body, digestmod=hashlib.sha256).hexdigest()
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay journaled webhook bodies")
+    parser.add_argument("journal_dir", help="Directory with journal segments")
+    parser.add_argument("--mode", choices=["pipeline", "http", "dry-run"], default="dry-run")
+    parser.add_argument("--url", default="http://localhost:8000/webhook", help="Target for --mode http")
+    parser.add_argument("--speed", type=float, default=1.0, help="Timing multiplier (0 = no delays)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel requests in http mode")
+    parser.add_argument("--since", help="Start time (epoch seconds or ISO 8601)")
+    parser.add_argument("--until", help="End time (epoch seconds or ISO 8601)")
+    parser.add_argument("--limit", type=int, help="Stop after this many records")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=sys.stdout,
+    )
+
+    if args.mode != "dry-run" and not APP_SECRET:
+        parser.error("APP_SECRET must be set to re-sign replayed bodies")
+
+    statuses = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    if args.mode == "pipeline":
+        from app import create_app
+
+        # Don't journal the replayed bodies again (set before create_app; load_dotenv won't override it)
+        os.environ["JOURNAL_DIR"] = ""
+        test_client = create_app().test_client()
+
+        def post(body):
+            return test_client.post(
+                "/webhook",
+                data=body,
+                headers={"X-Hub-Signature-256": sign(body), "Content-Type": "application/json"},
+            ).status_code
+
+    elif args.mode == "http":
+        session = requests.Session()
+        session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+        def post(body):
+            try:
+                return session.post(
+                    args.url,
+                    data=body,
+                    headers={"X-Hub-Signature-256": sign(body), "Content-Type": "application/json"},
+                    timeout=30,
+                ).status_code
+            except requests.RequestException as e:
+                return type(e).__name__
+
+    else:
+
+        def post(body):
+            return "skipped"
+
+    def replay_one(body):
+        started = time.perf_counter()
+        status = post(body)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with lock:
+            statuses[status] += 1
+            latencies.append(elapsed_ms)
+
+    # Pipeline mode runs inline: the Flask test client is not meant to be shared across threads
+    workers = args.concurrency if args.mode == "http" else 1
+    first_ts = None
+    wall_start = time.monotonic()
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ts, body in iter_journal(args.journal_dir, parse_time(args.since), parse_time(args.until)):
+            if first_ts is None:
+                first_ts = ts
+            if args.speed > 0:
+                delay = wall_start + (ts - first_ts) / 1e9 / args.speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            if workers == 1:
+                replay_one(body)
+            else:
+                pool.submit(replay_one, body)
+            count += 1
+            if args.limit and count >= args.limit:
+                break
+
+    elapsed = time.monotonic() - wall_start
+    print(f"Replayed {count} records in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f}/s)")
+    print(f"Statuses: {dict(statuses)}")
+    if args.mode != "dry-run":
+        print(
+            f"Latency ms: p50={percentile(latencies, 50):.1f} p90={percentile(latencies, 90):.1f} "
+            f"p99={percentile(latencies, 99):.1f} max={max(latencies, default=0):.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
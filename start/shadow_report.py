@@ -0,0 +1,71 @@
+import argparse
+import sqlite3
+import time
+
+# --------------------------------------------------------------
+# Shadow traffic report
+# --------------------------------------------------------------
+#
+# Compares the primary and candidate engines recorded by shadow mode.
+#
+#   python start/shadow_report.py --db shadow_results.db --since-hours 24
+
+
+def percentile(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare primary and shadow engines")
+    parser.add_argument("--db", default="shadow_results.db", help="Shadow results database")
+    parser.add_argument("--since-hours", type=float, help="Only include the last N hours")
+    parser.add_argument("--examples", type=int, default=3, help="Differing answers to print")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.db)
+    query = "SELECT * FROM shadow_results"
+    params = []
+    if args.since_hours:
+        query += " WHERE created_at >= ?"
+        params.append(time.time() - args.since_hours * 3600)
+    connection.row_factory = sqlite3.Row
+    rows = connection.execute(query + " ORDER BY created_at", params).fetchall()
+    if not rows:
+        print("No shadow results recorded yet.")
+        return
+
+    pairs = {}
+    for row in rows:
+        pairs.setdefault((row["primary_engine"], row["candidate_engine"]), []).append(row)
+
+    for (primary, candidate), group in pairs.items():
+        ok = [row for row in group if row["candidate_error"] is None]
+        print(f"\n{primary} (primary) vs {candidate} (candidate): {len(group)} messages, {len(group) - len(ok)} candidate errors")
+        print(f"{'':<18}{'p50':>10}{'p90':>10}{'p99':>10}{'mean calls':>12}")
+        for label, prefix in ((primary, "primary"), (candidate, "candidate")):
+            latencies = [row[f"{prefix}_latency_ms"] for row in ok]
+            calls = [row[f"{prefix}_api_calls"] for row in ok]
+            print(
+                f"{label[:17]:<18}"
+                + "".join(f"{percentile(latencies, p):>8.0f}ms" for p in (50, 90, 99))
+                + f"{sum(calls) / len(calls) if calls else float('nan'):>12.2f}"
+            )
+        same = sum(1 for row in ok if (row["primary_output"] or "").strip() == (row["candidate_output"] or "").strip())
+        print(f"identical answers: {same}/{len(ok)}")
+        winners = {}
+        for row in group:
+            winners[row["primary_winner"]] = winners.get(row["primary_winner"], 0) + 1
+        print(f"primary path winners: {winners}")
+
+        differing = [row for row in ok if row["primary_output"] != row["candidate_output"]][: args.examples]
+        for row in differing:
+            print(f"\n  Q: {row['message']}")
+            print(f"  {primary}: {row['primary_output']}")
+            print(f"  {candidate}: {row['candidate_output']}")
+
+
+if __name__ == "__main__":
+    main()
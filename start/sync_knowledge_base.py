@@ -0,0 +1,58 @@
+import argparse
+import logging
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Allow `python start/sync_knowledge_base.py` from the repository root
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.knowledge_base_service import DATA_DIR, MANIFEST_PATH, sync_knowledge_base
+from app.services.openai_service import client, create_assistant
+
+# --------------------------------------------------------------
+# Load environment variables
+# --------------------------------------------------------------
+
+load_dotenv()
+OPENAI_ASSISTANT_ID = os.getenv("OPENAI_ASSISTANT_ID")
+
+# --------------------------------------------------------------
+# Sync the knowledge base
+# --------------------------------------------------------------
+#
+# Uploads only new or changed files from data/, removes files that were
+# deleted locally and attaches the current set to the assistant. Running it
+# again on an unchanged tree makes no API calls.
+#
+#   python start/sync_knowledge_base.py
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync data/ with the assistant's knowledge base")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory with the knowledge base documents")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="Local manifest file")
+    parser.add_argument("--assistant-id", default=OPENAI_ASSISTANT_ID, help="Assistant to attach the files to")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel uploads")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, os.getenv("LOG_LEVEL", "INFO")),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        stream=sys.stdout,
+    )
+
+    assistant_id = sync_knowledge_base(
+        client,
+        args.data_dir,
+        args.manifest,
+        assistant_id=args.assistant_id,
+        create_assistant=create_assistant,
+        workers=args.workers,
+    )
+    print(assistant_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,12 @@
 import os
 import logging
 from app import create_app
+from app.config import LOG_FORMAT
 
 # Configure logging before creating the app
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    format=LOG_FORMAT
 )
 
 logger = logging.getLogger(__name__)